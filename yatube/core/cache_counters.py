@@ -0,0 +1,40 @@
+"""
+Счётчики в кэше: версии лент, уведомлений и лимитов.
+
+incr и add в бэкендах кэша атомарны, но incr отсутствующего ключа
+падает, а два процесса могут одновременно попытаться его создать.
+Поэтому везде используется одна схема: incr, при промахе add, а если
+add опоздал - снова incr.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def generation():
+    """
+    Начальное значение версии.
+
+    После вытеснения счётчика из кэша начинаем не с 1, а с текущего
+    времени, чтобы не совпасть с версией старых записей кэша.
+    """
+    return int(time.time() * 1000)
+
+
+def incr(key, start=1, timeout=None):
+    """Увеличивает счётчик; отсутствующий создаётся со значением start."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, start, timeout):
+            cache.incr(key)
+
+
+def versions(keys, timeout=None):
+    """Значения счётчиков-версий; недостающие заводятся от generation()."""
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, generation(), timeout)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.followed import for_request
+
+
+def following(request):
+    # Множество читается из кэша, только если шаблон к нему обратился.
+    return {'following_ids': SimpleLazyObject(lambda: for_request(request))}
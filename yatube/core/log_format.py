@@ -0,0 +1,29 @@
+"""
+Форматирование логов одной JSON-строкой на запись.
+
+Поля из `extra` (url_name, queries, sql_ms, slowest и т. п.) попадают в
+объект рядом с сообщением, поэтому строки лога можно разбирать и
+агрегировать без регулярных выражений.
+"""
+import json
+import logging
+
+# Атрибуты, которые есть у любой LogRecord; всё остальное пришло из extra.
+_STANDARD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in _STANDARD
+        )
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core import ratelimit
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет накладные расходы проверки лимита записей "
+        "в микросекундах на запрос"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checks", type=int, default=10000)
+        parser.add_argument("--clients", type=int, default=100)
+
+    def handle(self, *args, **options):
+        checks, clients = options["checks"], options["clients"]
+        # Лимит недостижим: измеряется самый дорогой путь, get_many
+        # и incr, а не ранний отказ.
+        rules = {"ip": (checks + 1, 60)}
+        requests = []
+        for number in range(clients):
+            request = RequestFactory().post(
+                "/", REMOTE_ADDR=f"10.0.{number // 256}.{number % 256}"
+            )
+            request.user = AnonymousUser()
+            requests.append(request)
+        started = time.perf_counter()
+        for number in range(checks):
+            ratelimit.check(requests[number % clients], "benchmark", rules)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{elapsed / checks * 1e6:.1f} мкс на проверку "
+            f"({checks} проверок, {clients} клиентов)"
+        ))
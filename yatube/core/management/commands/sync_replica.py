@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную SQLite-базу в реплики из REPLICA_DATABASES "
+        "(замена репликации при локальной проверке)"
+    )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError(
+                "Реплики не настроены: задайте YATUBE_SQLITE_REPLICA=1"
+            )
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        if primary["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Команда работает только с SQLite")
+        source = sqlite3.connect(primary["NAME"])
+        try:
+            for alias in settings.REPLICA_DATABASES:
+                connections[alias].close()
+                name = connections[alias].settings_dict["NAME"]
+                target = sqlite3.connect(name)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(
+                    f"Реплика {alias} обновлена"
+                ))
+        finally:
+            source.close()
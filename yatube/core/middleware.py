@@ -0,0 +1,177 @@
+import heapq
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import routers, template_timing
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper: число запросов, общее время и самые долгие."""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            entry = (elapsed, self.count, sql)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif self.keep:
+                heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        return [
+            {"ms": round(elapsed * 1000, 2), "sql": sql}
+            for elapsed, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+
+def add_server_timing(response, name, duration, description=None):
+    """Дописывает метрику в заголовок Server-Timing (duration в секундах)."""
+    metric = f"{name};dur={duration * 1000:.1f}"
+    if description:
+        metric += f';desc="{description}"'
+    if response.has_header("Server-Timing"):
+        metric = f"{response['Server-Timing']}, {metric}"
+    response["Server-Timing"] = metric
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Считает SQL-запросы каждого запроса к сайту.
+
+    Число запросов и их суммарное время уходят в лог вместе с самыми
+    долгими запросами, а при SERVER_TIMING - в заголовок Server-Timing.
+    Бюджеты по имени URL задаются отдельно для чтения (GET, HEAD -
+    QUERY_BUDGETS) и для записи (остальные методы -
+    WRITE_QUERY_BUDGETS). Если бюджет
+    превышен, пишется предупреждение, а при QUERY_BUDGET_RAISE = True
+    (в тестах) поднимается QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(settings.SQL_SLOWEST_QUERIES)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        if settings.SERVER_TIMING:
+            add_server_timing(
+                response, "db", recorder.duration,
+                f"{recorder.count} queries",
+            )
+        logger.info(
+            "%s %s: %d SQL, %.1f мс", request.method, url_name,
+            recorder.count, recorder.duration * 1000,
+            extra={
+                "url_name": url_name,
+                "status": response.status_code,
+                "queries": recorder.count,
+                "sql_ms": round(recorder.duration * 1000, 2),
+                "slowest": recorder.slowest,
+            },
+        )
+        self.check_budget(url_name, request.method, recorder)
+        return response
+
+    def check_budget(self, url_name, method, recorder):
+        budgets = (
+            settings.QUERY_BUDGETS if method in ("GET", "HEAD")
+            else settings.WRITE_QUERY_BUDGETS
+        )
+        budget = budgets.get(url_name)
+        if budget is None or recorder.count <= budget:
+            return
+        message = (
+            f"{method} {url_name}: {recorder.count} SQL-запросов "
+            f"при бюджете {budget}"
+        )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={"slowest": recorder.slowest})
+
+
+class TemplateTimingMiddleware:
+    """
+    Добавляет в Server-Timing общее время отрисовки шаблонов (tpl) и
+    собственное время самых дорогих шаблонов и include (tpl-<имя>).
+    Работает при SERVER_TIMING.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SERVER_TIMING:
+            return self.get_response(request)
+        with template_timing.collect() as timings:
+            response = self.get_response(request)
+        if not timings.templates:
+            return response
+        add_server_timing(response, "tpl", timings.total, "templates")
+        for name, count, seconds in timings.slowest(
+            settings.TEMPLATE_TIMING_TOP
+        ):
+            metric = "tpl-" + re.sub(r"[^\w.-]", "-", name)
+            add_server_timing(response, metric, seconds, f"{name} x{count}")
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Включает чтение из реплик для GET-запросов к лентам и постам.
+
+    После любого запроса с записью в БД ставит cookie, с которой чтение
+    REPLICA_PIN_SECONDS идёт из основной БД. Метод не проверяется:
+    подписка и отписка записывают по GET.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.use_replica(False)
+        try:
+            response = self.get_response(request)
+            if settings.REPLICA_DATABASES and routers.wrote():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE, "1",
+                    max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                )
+            return response
+        finally:
+            routers.use_replica(False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.use_replica(
+            request.method in ("GET", "HEAD")
+            and request.resolver_match.namespace
+            in settings.REPLICA_URL_NAMESPACES
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        )
@@ -0,0 +1,112 @@
+"""
+Ограничение частоты записей скользящим окном.
+
+Для каждого правила (limit, window) в кэше лежат два счётчика: текущего
+окна и предыдущего. Число запросов за последние window секунд
+оценивается как previous * (1 - elapsed / window) + current, где
+elapsed - сколько прошло от начала текущего окна. Такая оценка не даёт
+клиенту удвоить лимит на стыке окон, а проверка стоит одного get_many и
+одного incr на правило. Между чтением и incr возможна гонка, поэтому
+при всплеске параллельных запросов лимит может быть превышен на
+единицы - для защиты от спама этого достаточно.
+
+Правила задаются в RATE_LIMITS по имени представления, отдельно для
+пользователя ('user') и для IP-адреса ('ip'):
+
+    RATE_LIMITS = {'add_comment': {'user': (20, 60), 'ip': (100, 60)}}
+"""
+import logging
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import cache_counters
+from .views import too_many_requests
+
+logger = logging.getLogger(__name__)
+
+
+def _identity(request, kind):
+    if kind == "user":
+        return request.user.pk if request.user.is_authenticated else None
+    if kind == "ip":
+        return request.META.get(settings.RATE_LIMIT_IP_META)
+    raise ValueError(f"Неизвестный тип лимита: {kind}")
+
+
+def _retry_after(previous, current, limit, window, elapsed):
+    """Через сколько секунд оценка опустится ниже лимита; 0 - уже ниже."""
+    if previous * (1 - elapsed / window) + current < limit:
+        return 0
+    if current < limit:
+        # Лимит освободится ещё в этом окне, когда затухнет предыдущее.
+        wait = window * (1 - (limit - current) / previous) - elapsed
+    else:
+        # Ждём следующего окна, где текущий счётчик станет предыдущим.
+        wait = window - elapsed + window * (1 - limit / current)
+    return max(1, math.ceil(wait))
+
+
+def check(request, scope, rules):
+    """
+    Учитывает запрос и возвращает 0 или число секунд до повтора.
+
+    Отклонённый запрос не учитывается, чтобы клиент, который ждёт
+    Retry-After, не продлевал себе блокировку.
+    """
+    now = time.time()
+    windows = []
+    for kind, (limit, window) in rules.items():
+        identity = _identity(request, kind)
+        if identity is None:
+            continue
+        index, elapsed = divmod(now, window)
+        prefix = f"ratelimit:{scope}:{kind}:{identity}:{window}:"
+        windows.append((
+            f"{prefix}{int(index)}", f"{prefix}{int(index) - 1}",
+            limit, window, elapsed,
+        ))
+    counts = cache.get_many(
+        [key for current, previous, *_ in windows
+         for key in (current, previous)]
+    )
+    retry_after = max((
+        _retry_after(counts.get(previous, 0), counts.get(current, 0),
+                     limit, window, elapsed)
+        for current, previous, limit, window, elapsed in windows
+    ), default=0)
+    if not retry_after:
+        for current, _, _, window, _ in windows:
+            # Счётчик нужен ещё одно окно - как предыдущий.
+            cache_counters.incr(current, timeout=2 * window)
+    return retry_after
+
+
+def rate_limit(scope, methods=None):
+    """
+    Отвечает 429 с Retry-After, если превышен лимит RATE_LIMITS[scope].
+
+    methods - методы, которые учитываются (по умолчанию все). Ставится
+    под login_required, чтобы лимит по пользователю видел request.user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rules = settings.RATE_LIMITS.get(scope)
+            if (rules and settings.RATE_LIMIT_ENABLED
+                    and (methods is None or request.method in methods)):
+                retry_after = check(request, scope, rules)
+                if retry_after:
+                    logger.warning(
+                        "Превышен лимит %s, повтор через %d с",
+                        scope, retry_after,
+                        extra={"scope": scope, "retry_after": retry_after,
+                               "path": request.path},
+                    )
+                    return too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,58 @@
+"""
+Чтение из реплик с «прочитай свою запись».
+
+ReplicaRoutingMiddleware разрешает чтение из реплики только на время
+GET-запроса к представлениям из REPLICA_URL_NAMESPACES. Всё остальное -
+записи, команды, фоновые задачи и запросы после записи - идёт в
+основную БД. Пользователь, который что-то записал, получает cookie и
+REPLICA_PIN_SECONDS читает только из основной БД, пока реплика его
+догоняет.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def use_replica(allowed):
+    """Выбирает реплику на весь запрос или запрещает чтение из реплик."""
+    replicas = settings.REPLICA_DATABASES
+    _state.replica = random.choice(replicas) if allowed and replicas else None
+    _state.wrote = False
+
+
+def use_primary():
+    """До конца запроса читаем из основной БД, не отмечая запись."""
+    _state.replica = None
+
+
+def on_replica():
+    return getattr(_state, "replica", None) is not None
+
+
+def wrote():
+    return getattr(_state, "wrote", False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return getattr(_state, "replica", None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # После записи и до конца запроса читаем своё из основной БД.
+        _state.replica = None
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными из основной БД.
+        return db not in settings.REPLICA_DATABASES
@@ -0,0 +1,17 @@
+"""
+PRAGMA для каждого нового соединения с SQLite.
+
+WAL позволяет читать во время записи, а synchronous=NORMAL в режиме WAL
+не теряет целостность и делает fsync только при чекпойнте. busy_timeout
+заставляет писателей ждать блокировку вместо ошибки «database is
+locked». Команды выполняются на самом sqlite3-соединении, мимо
+execute_wrapper, поэтому не попадают в счётчики запросов.
+"""
+from django.conf import settings
+
+
+def configure(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,74 @@
+"""
+Время отрисовки шаблонов по каждому шаблону и include.
+
+install() оборачивает Template.render, через него проходят и
+render(), и каждый {% include %}. Пока открыт collect(), для каждого
+шаблона копятся число отрисовок и собственное время - без времени
+вложенных шаблонов, так что сумма по всем шаблонам равна общему
+времени отрисовки.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.template.base import Template
+
+_state = threading.local()
+
+
+class RenderTimings:
+    def __init__(self):
+        self.templates = {}
+        self._children = []
+
+    @contextmanager
+    def measure(self, name):
+        self._children.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            own = elapsed - self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            count, seconds = self.templates.get(name, (0, 0.0))
+            self.templates[name] = (count + 1, seconds + own)
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.templates.values())
+
+    def slowest(self, limit):
+        """[(шаблон, число отрисовок, секунды)] по убыванию времени."""
+        return sorted(
+            ((name, count, seconds)
+             for name, (count, seconds) in self.templates.items()),
+            key=lambda item: item[2], reverse=True,
+        )[:limit]
+
+
+@contextmanager
+def collect():
+    timings = RenderTimings()
+    _state.timings = timings
+    try:
+        yield timings
+    finally:
+        _state.timings = None
+
+
+def install():
+    original = Template.render
+    if getattr(original, 'timed', False):
+        return
+
+    def render(self, context):
+        timings = getattr(_state, 'timings', None)
+        if timings is None:
+            return original(self, context)
+        with timings.measure(self.name or '<строка>'):
+            return original(self, context)
+
+    render.timed = True
+    Template.render = render
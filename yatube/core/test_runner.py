@@ -0,0 +1,24 @@
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """
+    Запуск тестов, в котором превышение QUERY_BUDGETS роняет тест.
+
+    Так бюджет проверяется на каждом запросе к сайту из любого теста,
+    а не только в posts.tests.test_query_budgets. Замеры каждого
+    запроса (INFO от core.middleware) в выводе тестов не печатаются.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_RAISE = True
+        self._request_log_level = logging.getLogger("core.middleware").level
+        logging.getLogger("core.middleware").setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger("core.middleware").setLevel(self._request_log_level)
+        super().teardown_test_environment(**kwargs)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import get_backend
 
 admin.site.register(Group)
 
@@ -13,6 +14,12 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ("group",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице - индекс полнотекстового поиска.
+        if not search_term:
+            return queryset, False
+        return get_backend().filter_posts(queryset, search_term), False
+
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
@@ -26,7 +33,12 @@ class FollowAdmin(admin.ModelAdmin):
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ("post", "author", "text", "created")
-    search_fields = ("post",)
+    search_fields = ("text",)
     list_filter = ("created",)
     list_editable = ("text",)
     empty_value_display = "-пусто-"
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return get_backend().filter_comments(queryset, search_term), False
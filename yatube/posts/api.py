@@ -0,0 +1,214 @@
+"""
+JSON API лент, постов и комментариев только для чтения.
+
+Строки выбираются через `.values()` без создания моделей и без
+шаблонов. Страницы листаются курсором (`?cursor=`), набор полей
+задаётся через `?fields=id,text`. ETag считается от тела ответа, а для
+анонимных запросов к лентам ответ вместе с ETag берётся из кэша страниц
+(см. posts.decorators).
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import conditional_page, require_safe
+
+from . import feed_cache, live
+from .decorators import anonymous_page_cache, cursor_token
+from .models import Comment, Post
+from .paginators import CursorPaginator
+
+# Имя поля в ответе -> путь для .values().
+POST_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "author": "author__username",
+    "group": "group__slug",
+    "image": "image",
+    "comment_count": "comment_count",
+}
+COMMENT_FIELDS = {
+    "id": "id",
+    "post": "post_id",
+    "text": "text",
+    "created": "created",
+    "author": "author__username",
+}
+
+
+def post_fields_param(value):
+    names = dict.fromkeys(
+        name.strip() for name in value.split(",") if name.strip()
+    )
+    if any(name not in POST_FIELDS for name in names):
+        return None
+    return ",".join(names)
+
+
+# Параметры, от которых зависит ответ ленты (ключ кэша страниц).
+FEED_PARAMS = {"cursor": cursor_token, "fields": post_fields_param}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_view(login=False):
+    """Ошибки отдаются JSON, а не HTML-страницами; 304 по ETag."""
+    def decorator(view):
+        @require_safe
+        @conditional_page
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                if login and not request.user.is_authenticated:
+                    raise ApiError(401, "Требуется авторизация")
+                return view(request, *args, **kwargs)
+            except Http404:
+                return JsonResponse({"detail": "Не найдено"}, status=404)
+            except ApiError as error:
+                return JsonResponse(
+                    {"detail": error.detail}, status=error.status
+                )
+        return wrapper
+    return decorator
+
+
+def selected_fields(request, fields):
+    requested = request.GET.get("fields")
+    if not requested:
+        return dict(fields)
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(400, f"Неизвестные поля: {', '.join(unknown)}")
+    return {name: fields[name] for name in names}
+
+
+def serialize(row, fields):
+    data = {name: row[path] for name, path in fields.items()}
+    if "image" in data:
+        data["image"] = data["image"] and settings.MEDIA_URL + data["image"]
+    return data
+
+
+def feed_response(request, queryset, fields, key="pub_date", tiebreak="pk",
+                  per_page=None):
+    fields = selected_fields(request, fields)
+    paths = set(fields.values()) | {key, tiebreak}
+    paginator = CursorPaginator(
+        queryset.values(*paths), per_page or settings.SORTING_VALUE,
+        key=key, tiebreak=tiebreak,
+    )
+    page = paginator.get_cursor_page(request.GET.get("cursor"))
+    return JsonResponse({
+        "results": [serialize(row, fields) for row in page],
+        "next": paginator.next_cursor,
+        "previous": paginator.previous_cursor,
+    })
+
+
+def scope_pk(scope, value):
+    pk = feed_cache.scope_pk(scope, value)
+    if pk is None:
+        raise Http404
+    return pk
+
+
+@anonymous_page_cache(feed_cache.GLOBAL, params=FEED_PARAMS)
+@json_view()
+def index(request):
+    return feed_response(request, Post.objects.all(), POST_FIELDS)
+
+
+@anonymous_page_cache(feed_cache.GROUP, "slug", params=FEED_PARAMS)
+@json_view()
+def group_posts(request, slug):
+    group_id = scope_pk(feed_cache.GROUP, slug)
+    return feed_response(
+        request, Post.objects.filter(group_id=group_id), POST_FIELDS
+    )
+
+
+@anonymous_page_cache(feed_cache.AUTHOR, "username",
+                      params=FEED_PARAMS)
+@json_view()
+def profile(request, username):
+    author_id = scope_pk(feed_cache.AUTHOR, username)
+    return feed_response(
+        request, Post.objects.filter(author_id=author_id), POST_FIELDS
+    )
+
+
+@json_view(login=True)
+def follow_index(request):
+    # Как и в HTML-ленте, порядок задают колонки FeedEntry.
+    post_list = Post.objects.filter(
+        feed_entries__user=request.user
+    ).annotate(
+        feed_date=F("feed_entries__pub_date"),
+        feed_post=F("feed_entries__post"),
+    )
+    return feed_response(
+        request, post_list, POST_FIELDS,
+        key="feed_date", tiebreak="feed_post",
+    )
+
+
+@json_view()
+def post_detail(request, post_id):
+    fields = selected_fields(request, POST_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *set(fields.values())
+    ).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(serialize(row, fields))
+
+
+@json_view()
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return feed_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        key="created", per_page=settings.COMMENTS_PER_PAGE,
+    )
+
+
+@json_view()
+def live_posts(request):
+    """
+    Короткий опрос: сразу отвечает версией ленты и числом новых постов.
+
+    Retry-After подсказывает клиенту, когда спросить снова.
+
+    ?feed=index|follow, ?after=<id самого нового поста у клиента>,
+    ?version=<версия из прошлого ответа или со страницы ленты>.
+    """
+    feed = request.GET.get("feed", live.INDEX)
+    if feed not in live.FEEDS:
+        raise ApiError(400, f"Неизвестная лента: {feed}")
+    if feed == live.FOLLOW and not request.user.is_authenticated:
+        raise ApiError(401, "Требуется авторизация")
+    try:
+        after = int(request.GET.get("after", 0))
+    except ValueError:
+        raise ApiError(400, "after должен быть числом")
+    known = request.GET.get("version")
+    author_ids = (
+        live.followed_authors(request.user) if feed == live.FOLLOW else ()
+    )
+    current = live.version(feed, author_ids)
+    new = 0
+    if current != known:
+        new = live.count_new(feed, request.user, after)
+    response = JsonResponse({"version": current, "new": new})
+    response["Cache-Control"] = "no-store"
+    response["Retry-After"] = str(settings.LIVE_POLL_INTERVAL)
+    return response
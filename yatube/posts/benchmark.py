@@ -0,0 +1,159 @@
+"""
+Замеры страниц posts на заполненной БД (см. команду seed_load).
+
+Для каждой страницы выбираются самые тяжёлые объекты - крупнейшая
+группа, самый активный автор, пост с наибольшим числом комментариев,
+лента пользователя с наибольшим числом подписок. Затем страница
+запрашивается несколько раз, записываются процентили времени ответа и
+число SQL-запросов. Результат сравнивается с сохранённой базой.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .paginators import CursorPaginator
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * rank / 100) - 1, 0)]
+
+
+def targets():
+    """Отдаёт (имя, url) для всех страниц, которые можно запросить GET."""
+    reader = UserStats.objects.order_by("-following_count").first()
+    author = UserStats.objects.order_by("-post_count").first()
+    group = Group.objects.annotate(
+        total=Count("posts")
+    ).order_by("-total").first()
+    post = Post.objects.order_by("-comment_count", "-pk").first()
+    paginator = CursorPaginator(Post.objects.all(), settings.SORTING_VALUE)
+    paginator.get_cursor_page(None)
+    total_pages = max(Post.objects.count() // settings.SORTING_VALUE, 1)
+    word = post.text.split()[0] if post and post.text.split() else "пост"
+    urls = [
+        ("index", reverse("posts:index")),
+        ("index_cursor",
+         f"{reverse('posts:index')}?cursor={paginator.next_cursor or ''}"),
+        ("index_deep_page",
+         f"{reverse('posts:index')}?page={total_pages // 2 or 1}"),
+        ("search", f"{reverse('posts:search')}?{urlencode({'q': word})}"),
+        ("post_create", reverse("posts:post_create")),
+        ("follow_index", reverse("posts:follow_index")),
+        ("api_index", reverse("api:index")),
+        ("api_follow_index", reverse("api:follow_index")),
+        ("trending", reverse("posts:trending")),
+        ("group_index", reverse("posts:group_index")),
+    ]
+    if group is not None:
+        urls.append(("group_list", reverse(
+            "posts:group_list", kwargs={"slug": group.slug}
+        )))
+    if author is not None:
+        username = User.objects.get(pk=author.user_id).username
+        urls.append(("profile", reverse(
+            "posts:profile", kwargs={"username": username}
+        )))
+    if post is not None:
+        urls += [
+            ("post_detail", reverse("posts:post_detail", args=(post.pk,))),
+            ("post_comments",
+             reverse("posts:post_comments", args=(post.pk,))),
+            ("api_post_detail", reverse("api:post_detail", args=(post.pk,))),
+            ("api_post_comments",
+             reverse("api:post_comments", args=(post.pk,))),
+        ]
+    user = User.objects.get(pk=reader.user_id) if reader else None
+    # Форму правки открывает только автор поста.
+    own_post = Post.objects.filter(author=user).order_by("-pk").first()
+    if own_post is not None:
+        urls.append(("post_edit", reverse(
+            "posts:post_edit", args=(own_post.pk,)
+        )))
+    return user, urls
+
+
+def measure(client, url, repeat, warm=False):
+    """Процентили времени ответа в мс и число запросов к БД."""
+    timings, queries = [], None
+    client.get(url)
+    for _ in range(repeat):
+        if not warm:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{url}: статус {response.status_code}")
+        timings.append(elapsed * 1000)
+        queries = len(captured)
+    result = {
+        f"p{rank}_ms": round(percentile(timings, rank), 2)
+        for rank in PERCENTILES
+    }
+    result.update(url=url, queries=queries, status=response.status_code)
+    return result
+
+
+def run(repeat=20, warm=False):
+    user, urls = targets()
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    return {
+        "dataset": {
+            model._meta.label_lower: model.objects.count()
+            for model in (User, Group, Post, Comment, Follow)
+        },
+        "results": {
+            name: measure(client, url, repeat, warm) for name, url in urls
+        },
+    }
+
+
+def compare(current, baseline, tolerance=0.5, min_delta_ms=2.0):
+    """
+    Строки отчёта и список регрессий относительно baseline.
+
+    Число запросов к БД от машины не зависит, поэтому любой рост -
+    регрессия. Время шумит сильнее, поэтому медиана должна вырасти
+    больше чем на `tolerance` и не меньше чем на min_delta_ms.
+    """
+    lines, regressions = [], []
+    if current["dataset"] != baseline.get("dataset"):
+        lines.append(
+            f"Данные отличаются от базы: {baseline.get('dataset')}, "
+            f"сейчас {current['dataset']}"
+        )
+    old_results = baseline.get("results", {})
+    for name, result in current["results"].items():
+        old = old_results.get(name)
+        if old is None:
+            lines.append(f"{name}: p50 {result['p50_ms']} мс, "
+                         f"запросов {result['queries']} (нет в базе)")
+            continue
+        delta = result["p50_ms"] - old["p50_ms"]
+        ratio = delta / old["p50_ms"] if old["p50_ms"] else 0
+        slower = ratio > tolerance and delta >= min_delta_ms
+        more_queries = result["queries"] > old["queries"]
+        mark = " РЕГРЕССИЯ" if slower or more_queries else ""
+        lines.append(
+            f"{name}: p50 {old['p50_ms']} -> {result['p50_ms']} мс "
+            f"({ratio:+.0%}), запросов {old['queries']} -> "
+            f"{result['queries']}{mark}"
+        )
+        if mark:
+            regressions.append(name)
+    return lines, regressions
@@ -0,0 +1,127 @@
+"""
+Конкурентная нагрузка на БД: всплеск комментариев на фоне чтения лент.
+
+Писатели создают комментарии к «горячим» постам, читатели листают
+главную и комментарии. Каждая операция заканчивается как запрос к
+сайту - close_old_connections(), так что CONN_MAX_AGE решает, открывать
+ли новое соединение. Один и тот же прогон выполняется с заводскими
+настройками SQLite (журнал отката, соединение на запрос) и с
+настройками проекта (SQLITE_PRAGMAS, CONN_MAX_AGE).
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, OperationalError,
+                       close_old_connections, connection, connections)
+from django.test.utils import override_settings
+
+from .benchmark import percentile
+from .models import Comment, Post, User
+
+MARKER = "Нагрузочный комментарий"
+
+
+@contextmanager
+def profile(stock):
+    """
+    Заводское поведение: без PRAGMA и с новым соединением на запрос.
+
+    journal_mode хранится в самом файле БД, поэтому журнал отката
+    включается явно, один раз до начала нагрузки.
+    """
+    database = connections.databases[DEFAULT_DB_ALIAS]
+    saved = database.get("CONN_MAX_AGE", 0)
+    connection.close()
+    if stock:
+        database["CONN_MAX_AGE"] = 0
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode = delete")
+        connection.close()
+    try:
+        with override_settings(
+            SQLITE_PRAGMAS={} if stock else settings.SQLITE_PRAGMAS
+        ):
+            yield
+    finally:
+        database["CONN_MAX_AGE"] = saved
+        connection.close()
+
+
+def _worker(action, deadline, timings, errors):
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                action()
+            except OperationalError:
+                errors.append(1)
+            else:
+                timings.append((time.perf_counter() - started) * 1000)
+            close_old_connections()
+    finally:
+        connection.close()
+
+
+def _summary(timings, errors, duration):
+    return {
+        "per_s": round(len(timings) / duration, 1),
+        "p50_ms": round(percentile(timings, 50), 2) if timings else None,
+        "p99_ms": round(percentile(timings, 99), 2) if timings else None,
+        "errors": len(errors),
+    }
+
+
+def run(stock, writers=4, readers=8, duration=5.0, seed=0):
+    """Операции в секунду, задержки и ошибки блокировки по ролям."""
+    rnd = random.Random(seed)
+    posts = list(Post.objects.order_by("-comment_count").values_list(
+        "pk", flat=True
+    )[:50])
+    users = list(User.objects.values_list("pk", flat=True)[:200])
+    if not posts or not users:
+        raise ValueError("Нужны посты и пользователи, см. seed_load")
+
+    def write():
+        Comment.objects.create(
+            post_id=rnd.choice(posts), author_id=rnd.choice(users),
+            text=MARKER,
+        )
+
+    def read():
+        list(Post.objects.select_related("author", "group")[
+            :settings.SORTING_VALUE
+        ])
+        list(Comment.objects.filter(post_id=rnd.choice(posts))[
+            :settings.COMMENTS_PER_PAGE
+        ])
+
+    roles = {"write": (write, writers), "read": (read, readers)}
+    results = {name: ([], []) for name in roles}
+    with profile(stock):
+        deadline = time.perf_counter() + duration
+        threads = [
+            threading.Thread(
+                target=_worker, args=(action, deadline, *results[name])
+            )
+            for name, (action, count) in roles.items()
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return {
+        name: _summary(timings, errors, duration)
+        for name, (timings, errors) in results.items()
+    }
+
+
+def cleanup():
+    """Удаляет комментарии нагрузки, счётчики поправят сигналы."""
+    comments = Comment.objects.filter(text=MARKER)
+    total = comments.count()
+    comments.delete()
+    return total
@@ -0,0 +1,190 @@
+"""
+Потоковый перенос контента в формате NDJSON.
+
+Каждая строка - одна запись `{"model": ..., "pk": ..., "fields": {...}}`,
+модели идут в порядке зависимостей: пользователи, группы, посты,
+комментарии, подписки. Картинки передаются путём внутри MEDIA_ROOT,
+сами файлы переносятся отдельно. Пользователи выгружаются без прав
+персонала: они у каждого окружения свои. Хэши паролей попадают в
+выгрузку только по явному флагу `passwords`; без них пользователи
+загружаются с непригодным паролем и входят через сброс пароля.
+
+И выгрузка, и загрузка держат в памяти не больше одной пачки строк.
+"""
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+
+from . import counters, search, timeline, trending
+from .models import Comment, Follow, Group, Post, User
+
+MODELS = (
+    (User, ("username", "email", "first_name", "last_name",
+            "is_active", "date_joined")),
+    (Group, ("title", "slug", "description")),
+    (Post, ("text", "pub_date", "author_id", "group_id", "image",
+            "comment_count")),
+    (Comment, ("post_id", "author_id", "text", "created")),
+    (Follow, ("user_id", "author_id")),
+)
+LABELS = {model._meta.label_lower: (model, fields) for model, fields in MODELS}
+# Поля, которые выгружаются по флагу и могут отсутствовать при загрузке.
+OPTIONAL_FIELDS = {User: {"password": UNUSABLE_PASSWORD_PREFIX}}
+
+
+class Progress:
+    """Печатает число строк и скорость не чаще раза в `interval` секунд."""
+
+    def __init__(self, write, interval=1.0):
+        self.write = write
+        self.interval = interval
+        self.started = self.reported = time.monotonic()
+        self.counts = {}
+
+    def add(self, label, count=1):
+        self.counts[label] = self.counts.get(label, 0) + count
+        now = time.monotonic()
+        if now - self.reported >= self.interval:
+            self.reported = now
+            self.report()
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        parts = ", ".join(f"{label}: {n}" for label, n in self.counts.items())
+        self.write(
+            f"{parts} - всего {self.total} строк, "
+            f"{self.total / elapsed:.0f} строк/с"
+        )
+
+
+class ContentEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder обрезает время до миллисекунд.
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_content(stream, chunk_size=2000, progress=None, passwords=False):
+    """Пишет весь контент в stream, возвращает число строк."""
+    encoder = ContentEncoder(ensure_ascii=False)
+    written = 0
+    for model, fields in MODELS:
+        label = model._meta.label_lower
+        if passwords and model is User:
+            fields += ("password",)
+        rows = model.objects.order_by("pk").values_list("pk", *fields)
+        for pk, *values in rows.iterator(chunk_size=chunk_size):
+            stream.write(encoder.encode({
+                "model": label, "pk": pk, "fields": dict(zip(fields, values)),
+            }))
+            stream.write("\n")
+            written += 1
+            if progress is not None:
+                progress.add(label)
+    return written
+
+
+@contextmanager
+def _keep_dates():
+    # bulk_create заполняет auto_now_add текущим временем, а при переносе
+    # даты нужно сохранить.
+    date_fields = [Post._meta.get_field("pub_date"),
+                   Comment._meta.get_field("created")]
+    for field in date_fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in date_fields:
+            field.auto_now_add = True
+
+
+def _records(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            model, fields = LABELS[record["model"]]
+            values = {name: record["fields"][name] for name in fields}
+            for name, default in OPTIONAL_FIELDS.get(model, {}).items():
+                values[name] = record["fields"].get(name, default)
+            yield model(pk=record["pk"], **values)
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"Строка {number}: {error!r}") from error
+
+
+def _batches(objs, batch_size):
+    model, batch = None, []
+    for obj in objs:
+        if type(obj) is not model or len(batch) >= batch_size:
+            if batch:
+                yield model, batch
+            model, batch = type(obj), []
+        batch.append(obj)
+    if batch:
+        yield model, batch
+
+
+def import_content(stream, batch_size=2000, ignore_conflicts=False,
+                   rebuild=True, progress=None):
+    """
+    Загружает NDJSON из stream пачками по batch_size, возвращает число строк.
+
+    Каждая пачка вставляется одним bulk_create в своей транзакции.
+    Первичные ключи сохраняются, поэтому ссылки между записями не нужно
+    перекладывать. После загрузки пересобираются денормализованные
+    данные, если не передан rebuild=False.
+    """
+    loaded = bulk_load(
+        _records(stream), batch_size, ignore_conflicts, progress
+    )
+    if rebuild and loaded:
+        rebuild_derived(batch_size)
+    return loaded
+
+
+def bulk_load(objs, batch_size=2000, ignore_conflicts=False, progress=None):
+    """
+    Вставляет поток объектов пачками, возвращает их число.
+
+    Соседние объекты одной модели собираются в пачку до batch_size и
+    вставляются одним bulk_create в своей транзакции. Сигнал
+    post_bulk_create не отправляется: после загрузки вызывающий код
+    сам пересобирает данные через rebuild_derived().
+    """
+    loaded = 0
+    with _keep_dates():
+        for model, batch in _batches(objs, batch_size):
+            with transaction.atomic():
+                models.QuerySet(model).bulk_create(
+                    batch, ignore_conflicts=ignore_conflicts
+                )
+            loaded += len(batch)
+            if progress is not None:
+                progress.add(model._meta.label_lower, len(batch))
+    return loaded
+
+
+def rebuild_derived(batch_size=2000):
+    """Счётчики, ленты подписок, поисковый индекс и кэш."""
+    counters.recount_users(batch_size)
+    counters.recount_comments(batch_size)
+    counters.recount_groups(batch_size)
+    timeline.rebuild()
+    search.get_backend().rebuild()
+    trending.rebuild()
+    # Закэшированные страницы, версии лент и id по slug могли устареть
+    # все сразу, поэтому кэш проще очистить целиком.
+    cache.clear()
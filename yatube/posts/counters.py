@@ -0,0 +1,162 @@
+"""
+Денормализованные счётчики постов, комментариев, подписок и групп.
+
+Счётчики меняются атомарными UPDATE ... SET x = x + n, а команда
+`recount` пересчитывает их пачками, если они разошлись с данными.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Subquery
+
+from .models import Comment, Follow, Group, GroupStats, Post, User, UserStats
+
+USER_FIELDS = {
+    "post_count": (Post, "author_id"),
+    "follower_count": (Follow, "author_id"),
+    "following_count": (Follow, "user_id"),
+}
+
+
+def bump_user(user_id, field, delta):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f"{field}__gte": -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    if updated or delta < 0:
+        # Уменьшать отсутствующий счётчик незачем: строки нет либо
+        # у удалённого пользователя, либо её восстановит recount.
+        return
+    UserStats.objects.get_or_create(user_id=user_id)
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def bump_comments(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comment_count__gte=-delta)
+    posts.update(comment_count=F("comment_count") + delta)
+
+
+def _group_values(group_id, post_count):
+    # Последний пост группы - подзапросом по индексу post_group_date.
+    latest = Post.objects.filter(group_id=group_id).order_by(
+        "-pub_date", "-pk"
+    )
+    return {
+        "post_count": post_count,
+        "last_post_id": Subquery(latest.values("pk")[:1]),
+        "last_post_date": Subquery(latest.values("pub_date")[:1]),
+    }
+
+
+def bump_group(group_id, delta):
+    """
+    Меняет число постов группы и заново выбирает её последний пост.
+
+    Последний пост берётся подзапросом в том же UPDATE, поэтому
+    создание, удаление и перенос поста обновляют строку одним запросом.
+    """
+    values = _group_values(group_id, F("post_count") + delta)
+    stats = GroupStats.objects.filter(group_id=group_id)
+    if delta < 0:
+        stats = stats.filter(post_count__gte=-delta)
+    if stats.update(**values) or delta < 0:
+        return
+    GroupStats.objects.get_or_create(group_id=group_id)
+    GroupStats.objects.filter(group_id=group_id).update(**values)
+
+
+def _grouped(model, column, ids):
+    return dict(
+        model.objects.filter(**{f"{column}__in": ids})
+        .order_by()
+        .values_list(column)
+        .annotate(total=Count("pk"))
+    )
+
+
+def recount_users(batch_size=1000):
+    """Пересчитывает UserStats, возвращает число исправленных строк."""
+    fixed, last_pk = 0, 0
+    while True:
+        ids = list(
+            User.objects.filter(pk__gt=last_pk).order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return fixed
+        last_pk = ids[-1]
+        actual = {
+            field: _grouped(model, column, ids)
+            for field, (model, column) in USER_FIELDS.items()
+        }
+        stored = UserStats.objects.in_bulk(ids)
+        with transaction.atomic():
+            for user_id in ids:
+                values = {
+                    field: counts.get(user_id, 0)
+                    for field, counts in actual.items()
+                }
+                stats = stored.get(user_id)
+                if stats is None:
+                    if any(values.values()):
+                        UserStats.objects.create(user_id=user_id, **values)
+                        fixed += 1
+                elif any(getattr(stats, field) != value
+                         for field, value in values.items()):
+                    UserStats.objects.filter(user_id=user_id).update(**values)
+                    fixed += 1
+
+
+def recount_comments(batch_size=1000):
+    """Пересчитывает Post.comment_count, возвращает число исправлений."""
+    fixed, last_pk = 0, 0
+    while True:
+        rows = list(
+            Post.objects.filter(pk__gt=last_pk).order_by("pk")
+            .values_list("pk", "comment_count")[:batch_size]
+        )
+        if not rows:
+            return fixed
+        last_pk = rows[-1][0]
+        actual = _grouped(Comment, "post_id", [pk for pk, _ in rows])
+        with transaction.atomic():
+            for pk, stored in rows:
+                if actual.get(pk, 0) != stored:
+                    Post.objects.filter(pk=pk).update(
+                        comment_count=actual.get(pk, 0)
+                    )
+                    fixed += 1
+
+
+def recount_groups(batch_size=1000):
+    """Пересчитывает GroupStats, возвращает число исправленных строк."""
+    fixed, last_pk = 0, 0
+    while True:
+        ids = list(
+            Group.objects.filter(pk__gt=last_pk).order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return fixed
+        last_pk = ids[-1]
+        counts = _grouped(Post, "group_id", ids)
+        dates = dict(
+            Post.objects.filter(group_id__in=ids).order_by()
+            .values_list("group_id").annotate(latest=Max("pub_date"))
+        )
+        stored = GroupStats.objects.in_bulk(ids)
+        with transaction.atomic():
+            for group_id in ids:
+                stats = stored.get(group_id)
+                if (stats is not None
+                        and stats.post_count == counts.get(group_id, 0)
+                        and stats.last_post_date == dates.get(group_id)):
+                    continue
+                if stats is None:
+                    GroupStats.objects.create(group_id=group_id)
+                GroupStats.objects.filter(group_id=group_id).update(
+                    **_group_values(group_id, counts.get(group_id, 0))
+                )
+                fixed += 1
@@ -0,0 +1,117 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                set_response_etag)
+from django.utils.http import urlencode
+
+from core import routers
+
+from . import feed_cache
+from .paginators import decode_cursor, encode_cursor
+
+
+def _respond(request, entry):
+    content, content_type, etag = entry
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def page_number(value):
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    return str(number) if number > 0 else None
+
+
+def cursor_token(value):
+    cursor = decode_cursor(value)
+    return None if cursor is None else encode_cursor(*cursor)
+
+
+def choice(values):
+    return lambda value: value if value in values else None
+
+
+# Параметры постраничного вывода лент и их приведение к виду для ключа.
+PAGE_PARAMS = {"page": page_number, "cursor": cursor_token}
+
+
+def _page_key(request, params):
+    """
+    Ключ страницы или None, если её не надо кэшировать.
+
+    В ключ попадают только параметры, от которых зависит страница, в
+    приведённом виде: ?page=02 и ?page=2 - одна запись, а произвольные
+    ?x=N и непарсящиеся значения не плодят записей в кэше.
+    """
+    values = []
+    for name, normalize in params.items():
+        if name in request.GET:
+            value = normalize(request.GET[name])
+            if value is None:
+                return None
+            values.append((name, value))
+    query = urlencode(sorted(values))
+    return hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+
+
+def anonymous_page_cache(scope, kwarg=None, params=PAGE_PARAMS):
+    """
+    Кэширует страницу ленты целиком для анонимных GET-запросов.
+
+    Запрос без cookie сессии не может быть от авторизованного
+    пользователя, поэтому сессию и пользователя не загружаем вовсе.
+    Ключ страницы содержит версию ленты из `feed_cache` и параметры
+    `params` (имя -> функция приведения значения, None - не кэшировать),
+    которые читает представление. После записи страница
+    перестраивается, а пока версия не менялась, ответ (или 304 по
+    If-None-Match) отдаётся из кэша без запросов к БД. Промах кэша
+    строится по основной БД, а не по реплике.
+
+    Last-Modified не отправляется: правка поста, комментарий или
+    подписка меняют страницу, не меняя даты постов, и ответ 304 по
+    одному If-Modified-Since отдал бы устаревшую страницу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ("GET", "HEAD")
+                    or settings.SESSION_COOKIE_NAME in request.COOKIES):
+                return view(request, *args, **kwargs)
+            pk = None
+            if kwarg is not None:
+                pk = feed_cache.scope_pk(scope, kwargs[kwarg])
+                if pk is None:
+                    return view(request, *args, **kwargs)
+            path = _page_key(request, params)
+            if path is None:
+                return view(request, *args, **kwargs)
+            key = f"page:{scope}:{path}:{feed_cache.version(scope, pk)}"
+            entry = cache.get(key)
+            if entry is None:
+                # Реплика могла ещё не получить запись, которая сменила
+                # версию, и устаревшая страница легла бы под новый ключ.
+                routers.use_primary()
+                response = view(request, *args, **kwargs)
+                if (response.status_code != 200 or response.streaming
+                        or response.cookies):
+                    return response
+                set_response_etag(response)
+                entry = (
+                    response.content,
+                    response["Content-Type"],
+                    response["ETag"],
+                )
+                cache.set(key, entry, settings.FEED_CACHE_TIMEOUT)
+            return _respond(request, entry)
+        return wrapper
+    return decorator
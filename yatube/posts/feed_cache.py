@@ -0,0 +1,75 @@
+"""
+Версии (поколения) для кэша фрагментов лент.
+
+Каждая лента - главная, группа, профиль автора - имеет свой счётчик в
+кэше. Счётчик входит в ключ `{% cache %}`, а сигналы увеличивают его
+при изменении постов и комментариев, поэтому фрагмент может жить часами
+и всё равно обновляется сразу после записи. У каталога групп своя
+версия: её меняют только появление, удаление и перенос постов, а также
+правка самих групп.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core import cache_counters, routers
+
+from .models import Group, User
+
+GLOBAL = "global"
+GROUP = "group"
+AUTHOR = "author"
+GROUPS = "groups"
+
+
+def _key(scope, pk=None):
+    if pk is None:
+        return f"feed-version:{scope}"
+    return f"feed-version:{scope}:{pk}"
+
+
+def bump(*scopes):
+    for scope in scopes:
+        cache_counters.incr(
+            _key(*scope), cache_counters.generation(),
+            settings.CACHE_VERSION_TIMEOUT,
+        )
+
+
+def scopes_for(post):
+    scopes = [(GLOBAL,), (AUTHOR, post.author_id)]
+    if post.group_id:
+        scopes.append((GROUP, post.group_id))
+    return scopes
+
+
+def version(scope, pk=None):
+    return cache_counters.versions(
+        [_key(scope, pk)], settings.CACHE_VERSION_TIMEOUT
+    )[0]
+
+
+def fragment(scope, pk=None):
+    """
+    Тайм-аут и версия для тега `{% cache %}` во фрагменте ленты.
+
+    При чтении из реплики фрагмент берётся из кэша, но не сохраняется:
+    отстающая реплика записала бы старые посты под новую версию.
+    """
+    return {
+        "timeout": 0 if routers.on_replica() else settings.FEED_CACHE_TIMEOUT,
+        "version": version(scope, pk),
+    }
+
+
+def scope_pk(scope, value):
+    """id группы или автора по slug/username, запомненный в кэше."""
+    model, field = {GROUP: (Group, "slug"), AUTHOR: (User, "username")}[scope]
+    key = f"feed-scope:{scope}:{value}"
+    pk = cache.get(key)
+    if pk is None:
+        pk = model.objects.filter(**{field: value}).values_list(
+            "pk", flat=True
+        ).first()
+        if pk is not None:
+            cache.set(key, pk, settings.FEED_CACHE_TIMEOUT)
+    return pk
@@ -0,0 +1,53 @@
+"""
+Множество id авторов, на которых подписан пользователь.
+
+Множество загружается из posts_follow одним запросом и живёт в кэше, а
+сигналы Follow (подписка и отписка во views, админка, каскадное
+удаление) сбрасывают его. В шаблонах оно доступно как `following_ids`
+(core.context_processors.following), так что состояние подписки для
+любого числа авторов проверяется без запросов к БД. Множество служит
+только для показа: записи подписок всегда идут в БД.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+
+def _key(user_id):
+    return f"following:{user_id}"
+
+
+def author_ids(user_id):
+    key = _key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(user_id=user_id).values_list(
+            "author_id", flat=True
+        ))
+        cache.set(key, ids, settings.FOLLOWING_CACHE_TIMEOUT)
+    return ids
+
+
+def changed(user_id):
+    """
+    Сбрасывает множество после подписки или отписки.
+
+    Правка множества на месте (прочитать, изменить, записать) теряет id
+    при параллельных подписках, поэтому множество просто удаляется и
+    перечитывается целиком. Второе удаление после фиксации транзакции
+    убирает множество, которое успели перечитать до неё.
+    """
+    key = _key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def for_request(request):
+    """Множество текущего пользователя, не больше одного чтения на запрос."""
+    if not request.user.is_authenticated:
+        return frozenset()
+    if not hasattr(request, "_following_ids"):
+        request._following_ids = author_ids(request.user.pk)
+    return request._following_ids
@@ -0,0 +1,78 @@
+"""
+Нормализация загружаемых картинок постов.
+
+Фотографии с камер весят 10-20 МБ, а sorl декодирует исходник заново для
+каждой миниатюры. Поэтому при загрузке картинка уменьшается до
+IMAGE_UPLOAD_MAX_SIDE по длинной стороне, поворачивается по EXIF и
+перекодируется в IMAGE_UPLOAD_FORMAT без метаданных.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def _output_format():
+    image_format = settings.IMAGE_UPLOAD_FORMAT.upper()
+    if image_format == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return image_format
+
+
+def _flatten(image, image_format):
+    if image.mode in ("RGB", "L"):
+        return image
+    if "A" in image.getbands() or "transparency" in image.info:
+        image = image.convert("RGBA")
+        if image_format == "WEBP":
+            return image
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def normalize(upload):
+    """
+    Возвращает уменьшенную и перекодированную копию загруженного файла.
+
+    Исходник читается из временного файла загрузки, для JPEG через
+    `draft` декодируется сразу в уменьшенном масштабе. Анимированные
+    картинки возвращаются без изменений, чтобы не потерять кадры.
+    """
+    max_side = settings.IMAGE_UPLOAD_MAX_SIDE
+    image_format = _output_format()
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if getattr(image, "is_animated", False):
+            upload.seek(0)
+            return upload
+        image.draft("RGB", (max_side, max_side))
+        icc_profile = image.info.get("icc_profile")
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        image = _flatten(image, image_format)
+        buffer = io.BytesIO()
+        options = {"quality": settings.IMAGE_UPLOAD_QUALITY}
+        if image_format == "JPEG":
+            options.update(optimize=True, progressive=True)
+        if icc_profile:
+            options["icc_profile"] = icc_profile
+        image.save(buffer, image_format, **options)
+    name = os.path.splitext(upload.name)[0] + EXTENSIONS[image_format]
+    size = buffer.tell()
+    logger.info(
+        "Картинка %s: %s байт -> %s (%s байт, %sx%s)",
+        upload.name, upload.size, name, size, *image.size,
+    )
+    buffer.seek(0)
+    return InMemoryUploadedFile(
+        buffer, "image", name, Image.MIME[image_format], size, None
+    )
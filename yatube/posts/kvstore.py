@@ -0,0 +1,44 @@
+"""
+KV-хранилище sorl.thumbnail с пакетным чтением.
+
+Стандартное хранилище cached_db читает каждый ключ отдельно: на ленте из
+десяти постов это десять обращений к кэшу, а при промахе ещё и к БД.
+Здесь добавлен `get_many`, который достаёт миниатюры всей страницы одним
+`cache.get_many` и одним запросом к БД для промахов.
+"""
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class KVStore(CachedDBStore):
+    def get_many(self, image_files):
+        """Возвращает {ключ файла: ImageFile} для найденных в хранилище."""
+        raw_keys = {add_prefix(image.key): image.key for image in image_files}
+        values = self._get_many_raw(raw_keys)
+        return {
+            raw_keys[raw_key]: deserialize_image_file(value)
+            for raw_key, value in values.items()
+        }
+
+    def _get_many_raw(self, keys):
+        if not keys:
+            return {}
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            stored = dict(
+                KVStoreModel.objects.filter(key__in=missing)
+                .values_list("key", "value")
+            )
+            # Как и в cached_db, отсутствие ключа тоже кэшируем.
+            fetched = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(fetched, settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(fetched)
+        return {
+            key: value for key, value in values.items()
+            if value and value != EMPTY_VALUE
+        }
@@ -0,0 +1,92 @@
+"""
+Уведомления «N новых записей» для главной и ленты подписок.
+
+При создании поста в кэше увеличиваются два счётчика: общий и счётчик
+автора. Страница ленты отдаёт клиенту id самого нового поста и версию -
+значение общего счётчика или хэш счётчиков авторов из подписок. Клиент
+раз в LIVE_POLL_INTERVAL секунд спрашивает api/live/, сменилась ли
+версия; ответ приходит сразу, без ожидания в воркере. Только после смены
+версии один запрос к БД считает посты новее его id, а пока новых постов
+нет, опрос стоит одного-двух чтений кэша.
+"""
+import hashlib
+
+from django.conf import settings
+
+from core import cache_counters
+
+from . import followed
+from .models import FeedEntry, Post
+
+INDEX = "index"
+FOLLOW = "follow"
+FEEDS = (INDEX, FOLLOW)
+
+
+def _key(author_id=None):
+    if author_id is None:
+        return "live:global"
+    return f"live:author:{author_id}"
+
+
+def bump(author_ids):
+    for key in [_key()] + [_key(pk) for pk in set(author_ids)]:
+        cache_counters.incr(
+            key, cache_counters.generation(), settings.CACHE_VERSION_TIMEOUT
+        )
+
+
+def _versions(keys):
+    return cache_counters.versions(keys, settings.CACHE_VERSION_TIMEOUT)
+
+
+def followed_authors(user):
+    return sorted(followed.author_ids(user.pk))
+
+
+def version(feed, author_ids=()):
+    """Строка, которая меняется при появлении поста в ленте."""
+    if feed == INDEX:
+        return str(_versions([_key()])[0])
+    if not author_ids:
+        return "0"
+    keys = [_key(pk) for pk in author_ids]
+    state = ",".join(map(str, zip(author_ids, _versions(keys))))
+    return hashlib.md5(state.encode()).hexdigest()[:16]
+
+
+def count_new(feed, user, after):
+    """Число постов новее `after`, не больше LIVE_NEW_POSTS_LIMIT."""
+    if feed == INDEX:
+        posts = Post.objects.filter(pk__gt=after).values("pk")
+    else:
+        posts = FeedEntry.objects.filter(
+            user=user, post_id__gt=after
+        ).values("pk")
+    return posts[:settings.LIVE_NEW_POSTS_LIMIT].count()
+
+
+def start(request, feed):
+    """
+    Версия ленты для первой страницы, иначе None.
+
+    Читается до выборки постов: пост, созданный между выборкой и
+    чтением версии, иначе не попал бы ни на страницу, ни в уведомление.
+    """
+    if request.GET.get("cursor") or request.GET.get("page", "1") != "1":
+        return None
+    author_ids = followed_authors(request.user) if feed == FOLLOW else ()
+    return version(feed, author_ids)
+
+
+def state(feed, page_obj, known):
+    """Данные для клиента: лента, id самого нового поста и версия."""
+    if known is None:
+        return None
+    return {
+        "feed": feed,
+        "after": max((post.pk for post in page_obj), default=0),
+        "version": known,
+        "limit": settings.LIVE_NEW_POSTS_LIMIT,
+        "interval": settings.LIVE_POLL_INTERVAL,
+    }
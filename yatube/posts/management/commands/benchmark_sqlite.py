@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import concurrency
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность SQLite с заводскими и "
+        "проектными настройками при всплеске комментариев"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        profiles = (("до (заводские)", True), ("после (проект)", False))
+        try:
+            for title, stock in profiles:
+                result = concurrency.run(
+                    stock, options["writers"], options["readers"],
+                    options["duration"],
+                )
+                self.stdout.write(title)
+                for role, summary in result.items():
+                    self.stdout.write(
+                        f"  {role}: {summary['per_s']} оп/с, "
+                        f"p50 {summary['p50_ms']} мс, "
+                        f"p99 {summary['p99_ms']} мс, "
+                        f"ошибок {summary['errors']}"
+                    )
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            removed = concurrency.cleanup()
+            self.stderr.write(f"Удалено комментариев нагрузки: {removed}")
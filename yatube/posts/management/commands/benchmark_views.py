@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = "Замеряет страницы posts и сравнивает с сохранённой базой"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--warm", action="store_true",
+            help="не очищать кэш перед каждым запросом",
+        )
+        parser.add_argument("--baseline", help="JSON с прошлыми замерами")
+        parser.add_argument("--output", help="куда сохранить замеры")
+        parser.add_argument("--tolerance", type=float, default=0.5)
+        parser.add_argument(
+            "--fail-on-regression", action="store_true",
+            help="завершиться с ошибкой, если есть регрессии",
+        )
+
+    def handle(self, *args, **options):
+        current = benchmark.run(options["repeat"], options["warm"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                json.dump(current, stream, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+                stream.write("\n")
+        if not options["baseline"]:
+            for name, result in current["results"].items():
+                self.stdout.write(
+                    f"{name}: p50 {result['p50_ms']} мс, "
+                    f"p90 {result['p90_ms']} мс, p99 {result['p99_ms']} мс, "
+                    f"запросов {result['queries']}"
+                )
+            return
+        with open(options["baseline"], encoding="utf-8") as stream:
+            baseline = json.load(stream)
+        lines, regressions = benchmark.compare(
+            current, baseline, options["tolerance"]
+        )
+        for line in lines:
+            self.stdout.write(line)
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"Регрессии: {', '.join(regressions)}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommend
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации «Кого почитать» по графу подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, action="append", dest="user_ids",
+            help="id пользователя, можно указать несколько раз",
+        )
+        parser.add_argument(
+            "--top-k", type=int,
+            help="сколько авторов хранить (RECOMMENDATIONS_TOP_K)",
+        )
+
+    def handle(self, *args, **options):
+        count = recommend.build(options["user_ids"], options["top_k"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Рекомендации пересчитаны для пользователей: {count}"
+        ))
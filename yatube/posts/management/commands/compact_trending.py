@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит просмотры в оценки популярности и сдвигает epoch "
+        "(запускать раз в TRENDING_COMPACT_INTERVAL секунд)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="пересчитать оценки по комментариям с нуля",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            trending.rebuild()
+            self.stdout.write(self.style.SUCCESS("Оценки пересчитаны"))
+            return
+        views = trending.compact()
+        self.stdout.write(self.style.SUCCESS(
+            f"Оценки сжаты, учтено просмотров: {views}"
+        ))
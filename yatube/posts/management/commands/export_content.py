@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.content import Progress, export_content
+
+
+class Command(BaseCommand):
+    help = "Выгружает группы, посты, комментарии и подписки в NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output", nargs="?", default="-",
+            help="файл для записи, по умолчанию stdout",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--with-passwords", action="store_true",
+            help="выгрузить и хэши паролей пользователей",
+        )
+
+    def handle(self, *args, **options):
+        # Отчёт о ходе пишется в stderr, чтобы не смешиваться с данными.
+        progress = Progress(self.stderr.write)
+        params = {
+            "chunk_size": options["chunk_size"],
+            "progress": progress,
+            "passwords": options["with_passwords"],
+        }
+        if options["output"] == "-":
+            export_content(sys.stdout, **params)
+        else:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                export_content(stream, **params)
+        progress.report()
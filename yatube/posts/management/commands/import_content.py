@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.content import Progress, import_content
+
+
+class Command(BaseCommand):
+    help = "Загружает NDJSON из export_content пачками через bulk_create"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "input", nargs="?", default="-",
+            help="файл для чтения, по умолчанию stdin",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--ignore-conflicts", action="store_true",
+            help="пропускать строки с уже занятыми ключами",
+        )
+        parser.add_argument(
+            "--no-rebuild", action="store_false", dest="rebuild",
+            help="не пересобирать счётчики, ленты и поиск после загрузки",
+        )
+
+    def handle(self, *args, **options):
+        progress = Progress(self.stderr.write)
+        params = {
+            "batch_size": options["batch_size"],
+            "ignore_conflicts": options["ignore_conflicts"],
+            "rebuild": options["rebuild"],
+            "progress": progress,
+        }
+        try:
+            if options["input"] == "-":
+                loaded = import_content(sys.stdin, **params)
+            else:
+                with open(options["input"], encoding="utf-8") as stream:
+                    loaded = import_content(stream, **params)
+        except ValueError as error:
+            raise CommandError(error)
+        progress.report()
+        self.stdout.write(self.style.SUCCESS(f"Загружено строк: {loaded}"))
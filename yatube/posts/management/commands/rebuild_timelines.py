@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Пересобирает ленты подписок из текущих записей Follow"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, action="append", dest="user_ids",
+            help="id пользователя, можно указать несколько раз",
+        )
+
+    def handle(self, *args, **options):
+        count = timeline.rebuild(options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Пересобрано лент: {count}"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает денормализованные счётчики постов, подписок "
+            "и групп")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = counters.recount_users(batch_size)
+        posts = counters.recount_comments(batch_size)
+        groups = counters.recount_groups(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Исправлено счётчиков: пользователей {users}, постов {posts}, "
+            f"групп {groups}"
+        ))
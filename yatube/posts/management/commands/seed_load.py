@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seed
+from posts.content import Progress, bulk_load, rebuild_derived
+
+
+class Command(BaseCommand):
+    help = "Заполняет БД перекошенными синтетическими данными для замеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=30)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument("--follows", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["users"] < 2 or options["posts"] < 1:
+            raise CommandError("Нужно хотя бы 2 пользователя и 1 пост")
+        progress = Progress(self.stderr.write)
+        objs = seed.generate(
+            users=options["users"], groups=options["groups"],
+            posts=options["posts"], comments=options["comments"],
+            follows=options["follows"], seed=options["seed"],
+        )
+        loaded = bulk_load(objs, options["batch_size"], progress=progress)
+        progress.report()
+        self.stderr.write("Пересборка счётчиков, лент и поиска...")
+        rebuild_derived(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Создано строк: {loaded}"))
@@ -0,0 +1,51 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def warm(name):
+    try:
+        thumbnails.generate(name)
+    except Exception:
+        # Одна битая картинка не должна останавливать прогрев остальных.
+        logger.exception("Не удалось построить миниатюры для %s", name)
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    help = "Строит миниатюры для всех картинок постов в пуле процессов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None)
+        parser.add_argument("--chunk-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image="").order_by().values_list(
+            "image", flat=True
+        ).distinct()
+        started, done, failed = time.monotonic(), 0, 0
+        with thumbnails.worker_pool(options["workers"]) as pool:
+            results = pool.map(
+                warm, names.iterator(), chunksize=options["chunk_size"]
+            )
+            for ok in results:
+                done += 1
+                failed += not ok
+                if done % 1000 == 0:
+                    self.stdout.write(f"Обработано картинок: {done}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {done} картинок, ошибок {failed}, "
+            f"{time.monotonic() - started:.1f} с"
+        ))
+        if failed:
+            self.stderr.write(self.style.WARNING(
+                f"Не удалось обработать картинок: {failed}, "
+                "подробности в журнале"
+            ))
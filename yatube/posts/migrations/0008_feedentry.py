@@ -0,0 +1,72 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def fill_feeds(apps, schema_editor):
+    # Ленты существующих подписчиков; дальше их ведут сигналы
+    # (posts.timeline). Как в timeline.backfill - последние посты автора.
+    Follow = apps.get_model("posts", "Follow")
+    Post = apps.get_model("posts", "Post")
+    FeedEntry = apps.get_model("posts", "FeedEntry")
+    limit = getattr(settings, "TIMELINE_BACKFILL", 1000)
+    last_pk = 0
+    while True:
+        # Пачка подписок списком: курсор не держим открытым во время
+        # вставок.
+        follows = list(Follow.objects.filter(pk__gt=last_pk).order_by(
+            "pk"
+        ).values_list("pk", "user_id", "author_id")[:BATCH_SIZE])
+        if not follows:
+            return
+        last_pk = follows[-1][0]
+        posts = {}
+        entries = []
+        for _, user_id, author_id in follows:
+            if author_id not in posts:
+                posts[author_id] = list(Post.objects.filter(
+                    author_id=author_id
+                ).order_by("-pub_date").values_list(
+                    "pk", "pub_date"
+                )[:limit])
+            entries += [
+                FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in posts[author_id]
+            ]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_auto_20220523_2205'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date'], name='feed_entry_user_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:06
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def _grouped(model, column, ids):
+    return dict(
+        model.objects.filter(**{f"{column}__in": ids}).order_by()
+        .values_list(column).annotate(total=Count("pk"))
+    )
+
+
+def _batches(model):
+    last_pk = 0
+    while True:
+        ids = list(model.objects.filter(pk__gt=last_pk).order_by(
+            "pk"
+        ).values_list("pk", flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        last_pk = ids[-1]
+        yield ids
+
+
+def fill_counters(apps, schema_editor):
+    # Счётчики существующих данных; дальше их ведут сигналы
+    # (posts.counters), как после команды recount.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    UserStats = apps.get_model("posts", "UserStats")
+    for ids in _batches(User):
+        posts = _grouped(Post, "author_id", ids)
+        followers = _grouped(Follow, "author_id", ids)
+        following = _grouped(Follow, "user_id", ids)
+        UserStats.objects.bulk_create([
+            UserStats(
+                user_id=pk,
+                post_count=posts.get(pk, 0),
+                follower_count=followers.get(pk, 0),
+                following_count=following.get(pk, 0),
+            )
+            for pk in ids
+            if pk in posts or pk in followers or pk in following
+        ])
+    for ids in _batches(Post):
+        # Один UPDATE на каждое встретившееся в пачке число комментариев.
+        by_total = defaultdict(list)
+        for pk, total in _grouped(Comment, "post_id", ids).items():
+            by_total[total].append(pk)
+        for total, pks in by_total.items():
+            Post.objects.filter(pk__in=pks).update(comment_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0008_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('follower_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
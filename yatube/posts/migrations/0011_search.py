@@ -0,0 +1,42 @@
+from django.db import migrations
+
+TABLES = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE posts_comment_fts USING fts5("
+    "text, post_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+)
+
+
+def create_index(apps, schema_editor):
+    # Таблицы FTS5 нужны только бэкенду поиска для SQLite.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in TABLES:
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        "INSERT INTO posts_post_fts (rowid, text) "
+        "SELECT id, text FROM posts_post"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_comment_fts (rowid, text, post_id) "
+        "SELECT id, text, post_id FROM posts_comment"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE posts_post_fts")
+    schema_editor.execute("DROP TABLE posts_comment_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    # Счётчики уже существующих групп; дальше их ведут сигналы.
+    Group = apps.get_model("posts", "Group")
+    GroupStats = apps.get_model("posts", "GroupStats")
+    Post = apps.get_model("posts", "Post")
+    rows = []
+    for group_id in Group.objects.values_list("pk", flat=True):
+        posts = Post.objects.filter(group_id=group_id)
+        latest = posts.order_by("-pub_date", "-pk").first()
+        rows.append(GroupStats(
+            group_id=group_id,
+            post_count=posts.count(),
+            last_post=latest,
+            last_post_date=latest and latest.pub_date,
+        ))
+    GroupStats.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('last_post_date', models.DateTimeField(blank=True, null=True)),
+                ('last_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-last_post_date', '-group'], name='group_stats_activity'),
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-post_count', '-group'], name='group_stats_posts'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import CheckConstraint, F, Q, UniqueConstraint
+from django.dispatch import Signal
 
 User = get_user_model()
 
+# bulk_create не отправляет post_save, поэтому денормализованные данные
+# подписываются на этот сигнал отдельно.
+post_bulk_create = Signal(providing_args=["objs"])
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -23,6 +28,13 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        post_bulk_create.send(sender=self.model, objs=objs)
+        return objs
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
@@ -43,13 +55,39 @@ class Post(models.Model):
         upload_to="posts/",
         blank=True
     )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Затухающая сумма комментариев и просмотров (posts.trending).
+    trend_score = models.FloatField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"],
+                         name="post_date"),
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="post_author_date"),
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="post_group_date"),
+            models.Index(fields=["-trend_score", "-id"],
+                         name="post_trend"),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Счётчики меняются только атомарным UPDATE, поэтому сохранение
+        # поста из формы не должно затирать их старыми значениями.
+        if not self._state.adding and not kwargs.get("update_fields"):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ("comment_count", "trend_score")
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -69,6 +107,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("-created",)
+        indexes = [
+            models.Index(fields=["post", "-created", "-id"],
+                         name="comment_post_created"),
+        ]
 
     def __str__(self):
         return self.text
@@ -93,3 +135,115 @@ class Follow(models.Model):
             CheckConstraint(check=~Q(user=F("author")),
                             name="prevent_self_follow"),
         ]
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user"),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+
+def user_stats(user):
+    """Счётчики пользователя; для неактивного - нулевые, без записи в БД."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+class GroupStats(models.Model):
+    """Число постов группы и её последний пост (posts.counters)."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    last_post = models.ForeignKey(
+        Post,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="+"
+    )
+    last_post_date = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-last_post_date", "-group"],
+                         name="group_stats_activity"),
+            models.Index(fields=["-post_count", "-group"],
+                         name="group_stats_posts"),
+        ]
+
+    def __str__(self):
+        return str(self.group)
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="feed_entries"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ("-pub_date",)
+        constraints = [
+            UniqueConstraint(fields=["user", "post"],
+                             name="unique_feed_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-pub_date", "-post"],
+                         name="feed_entry_user_date"),
+        ]
+
+
+class Recommendation(models.Model):
+    """Автор, которого стоит предложить пользователю (posts.recommend)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="recommendations"
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["user", "author"],
+                             name="unique_recommendation"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-score"],
+                         name="recommendation_user_score"),
+        ]
+
+
+class TrendingEpoch(models.Model):
+    """Момент, к которому приведены все Post.trend_score."""
+    started = models.DateTimeField()
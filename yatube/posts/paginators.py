@@ -0,0 +1,257 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+                                   Paginator)
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .search import get_backend
+
+FORWARD = ">"
+BACKWARD = "<"
+
+
+def pack_token(values):
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def unpack_token(token):
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(direction, position, pk):
+    return pack_token([direction, position.isoformat(), pk])
+
+
+def decode_cursor(token):
+    """Возвращает (direction, position, pk) или None для битого токена."""
+    if not token:
+        return None
+    try:
+        direction, position, pk = unpack_token(token)
+        position = parse_datetime(position)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        return None
+    if direction not in (FORWARD, BACKWARD) or position is None:
+        return None
+    return direction, position, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Постраничный вывод по ключу (key, tiebreak) в порядке убывания.
+
+    Вместо OFFSET и COUNT(*) каждая страница выбирается одним запросом
+    `WHERE (key, id) < (...) LIMIT per_page + 1`, поэтому глубина
+    прокрутки не влияет на время ответа. Номера страниц заменены
+    непрозрачными токенами `?cursor=`.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, key="pub_date", tiebreak="pk"):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.tiebreak = tiebreak
+        self.next_cursor = None
+        self.previous_cursor = None
+        # Токен показанной страницы в каноническом виде (для ключей
+        # кэша); None - первая страница.
+        self.cursor = None
+
+    @property
+    def num_pages(self):
+        # Известны только соседние страницы: этого достаточно, чтобы
+        # has_next()/has_previous() у Page работали без подсчёта строк.
+        return 1 + bool(self.previous_cursor) + bool(self.next_cursor)
+
+    def _cursor(self, direction, obj):
+        # Строки бывают и моделями, и словарями из .values().
+        if isinstance(obj, dict):
+            return encode_cursor(direction, obj[self.key], obj[self.tiebreak])
+        return encode_cursor(
+            direction, getattr(obj, self.key), getattr(obj, self.tiebreak)
+        )
+
+    def _window(self, direction, position, pk):
+        # Условие `key <= x AND (key < x OR id < y)` вместо
+        # `key < x OR (key = x AND id < y)`: с OR SQLite читает индекс
+        # с самого начала, а так он сразу переходит к нужному месту.
+        key, tiebreak = self.key, self.tiebreak
+        if direction == FORWARD:
+            return self.object_list.filter(
+                Q(**{f"{key}__lte": position}),
+                Q(**{f"{key}__lt": position})
+                | Q(**{f"{tiebreak}__lt": pk}),
+            ).order_by(f"-{key}", f"-{tiebreak}")
+        return self.object_list.filter(
+            Q(**{f"{key}__gte": position}),
+            Q(**{f"{key}__gt": position})
+            | Q(**{f"{tiebreak}__gt": pk}),
+        ).order_by(key, tiebreak)
+
+    def get_cursor_page(self, token):
+        cursor = decode_cursor(token)
+        if cursor is None:
+            rows = list(
+                self.object_list.order_by(
+                    f"-{self.key}", f"-{self.tiebreak}"
+                )
+                [:self.per_page + 1]
+            )
+            direction = FORWARD
+        else:
+            direction = cursor[0]
+            rows = list(self._window(*cursor)[:self.per_page + 1])
+            self.cursor = encode_cursor(*cursor)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            if not rows:
+                return self.get_cursor_page(None)
+            rows.reverse()
+            self.next_cursor = self._cursor(FORWARD, rows[-1])
+            if has_more:
+                self.previous_cursor = self._cursor(BACKWARD, rows[0])
+        else:
+            if rows and has_more:
+                self.next_cursor = self._cursor(FORWARD, rows[-1])
+            if rows and cursor is not None:
+                self.previous_cursor = self._cursor(BACKWARD, rows[0])
+        return Page(rows, 1 + bool(self.previous_cursor), self)
+
+
+class CountCachePaginator(Paginator):
+    """
+    Нумерованный Paginator без COUNT(*) на каждый запрос.
+
+    Число строк берётся из счётчика (`count=`), если он есть. Иначе
+    строки считаются с LIMIT до PAGINATOR_EXACT_COUNT_LIMIT; если их
+    больше, используется оценка из кэша под `count_key`. Полный COUNT(*)
+    для оценки выполняет один запрос раз в PAGINATOR_COUNT_TIMEOUT, а
+    пока оценки нет, выводится порог: «больше 1000 записей».
+    """
+    def __init__(self, object_list, per_page, count_key=None, count=None):
+        if count_key is None and count is None:
+            raise ValueError("Нужен счётчик count или ключ кэша count_key")
+        super().__init__(object_list, per_page)
+        self.count_key = count_key
+        self.capped = False
+        if count is not None:
+            self.__dict__["_count"] = (count, False)
+
+    @cached_property
+    def _count(self):
+        cached = cache.get(self.count_key)
+        if cached is not None:
+            return cached, True
+        limit = settings.PAGINATOR_EXACT_COUNT_LIMIT
+        total = self.object_list[:limit + 1].count()
+        if total <= limit:
+            return total, False
+        timeout = settings.PAGINATOR_COUNT_TIMEOUT
+        if cache.add(f"{self.count_key}:lock", True, timeout):
+            total = self.object_list.count()
+            cache.set(self.count_key, total, timeout)
+            return total, True
+        # Оценку уже считает другой запрос.
+        self.capped = True
+        return limit, True
+
+    def _recount(self):
+        total = self.object_list.count()
+        cache.set(self.count_key, total, settings.PAGINATOR_COUNT_TIMEOUT)
+        self.__dict__["_count"] = (total, False)
+        self.__dict__.pop("num_pages", None)
+        self.capped = False
+
+    @property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def approximate(self):
+        return self._count[1]
+
+    def validate_number(self, number):
+        if not self.approximate:
+            return super().validate_number(number)
+        # Оценка может отставать от данных, поэтому номера за её
+        # пределами не отбрасываем, а проверяем выборкой в page().
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def _rows(self, number):
+        bottom = (number - 1) * self.per_page
+        return list(self.object_list[bottom:bottom + self.per_page + 1])
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        rows = self._rows(number)
+        if not rows and number > 1:
+            # За концом списка, как get_page, показываем последнюю
+            # страницу по оценке. Если пуста и она, оценка устарела:
+            # пересчитываем точно.
+            last = self.num_pages
+            if number > last:
+                number = last
+                rows = self._rows(number)
+            if not rows:
+                self._recount()
+                return super().page(min(number, self.num_pages))
+        if len(rows) > self.per_page:
+            self.__dict__["num_pages"] = max(self.num_pages, number + 1)
+        else:
+            self.__dict__["num_pages"] = number
+        return Page(rows[:self.per_page], number, self)
+
+
+class SearchPaginator(Paginator):
+    """
+    Постраничный вывод результатов поиска в порядке релевантности.
+
+    Курсор хранит (score, post_id) последнего результата, и бэкенд
+    поиска продолжает выдачу после него. Переход назад не нужен: у
+    поиска есть только ссылки «Первая» и «Следующая».
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, query):
+        super().__init__(object_list, per_page)
+        self.query = query
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    @property
+    def num_pages(self):
+        return 1 + bool(self.next_cursor)
+
+    def get_cursor_page(self, token):
+        after = None
+        if token:
+            try:
+                score, pk = unpack_token(token)
+                after = (float(score), int(pk))
+            except (binascii.Error, UnicodeError, TypeError, ValueError):
+                after = None
+        hits = get_backend().search(self.query, self.per_page + 1, after)
+        if len(hits) > self.per_page:
+            hits = hits[:self.per_page]
+            self.next_cursor = pack_token(list(hits[-1]))
+        posts = self.object_list.in_bulk([pk for _, pk in hits])
+        rows = [posts[pk] for _, pk in hits if pk in posts]
+        return Page(rows, 1, self)
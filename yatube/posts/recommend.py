@@ -0,0 +1,150 @@
+"""
+«Кого почитать»: рекомендации авторов, посчитанные заранее.
+
+Команда build_recommendations загружает граф подписок в память и для
+каждого пользователя оценивает кандидатов:
+- сколько авторов из его подписок читают кандидата (два шага по графу);
+- насколько группы постов кандидата совпадают с группами, в которых
+  пишут сам пользователь и его авторы;
+- сколько кандидат публиковал за последние RECENT.
+Лучшие RECOMMENDATIONS_TOP_K кандидатов сохраняются в Recommendation,
+а страницы читают их одним запросом по индексу (user, -score).
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import followed
+from .models import Follow, Post, Recommendation, User
+
+TWO_HOP_WEIGHT = 1.0
+GROUP_WEIGHT = 2.0
+ACTIVITY_WEIGHT = 0.5
+# Сколько самых пишущих авторов группы попадает в кандидаты.
+GROUP_CANDIDATES = 20
+# Самые активные авторы - кандидаты для всех, в том числе без подписок.
+POPULAR_CANDIDATES = 50
+RECENT = timedelta(days=30)
+BATCH_SIZE = 500
+
+
+class Graph:
+    """Всё, что нужно для оценки, одним проходом по каждой таблице."""
+
+    def __init__(self):
+        self.following = defaultdict(set)
+        rows = Follow.objects.values_list("user_id", "author_id")
+        for user_id, author_id in rows.iterator():
+            self.following[user_id].add(author_id)
+        self.groups = defaultdict(dict)
+        by_group = defaultdict(list)
+        rows = Post.objects.filter(group__isnull=False).order_by().values_list(
+            "author_id", "group_id"
+        ).annotate(total=Count("pk"))
+        for author_id, group_id, total in rows.iterator():
+            self.groups[author_id][group_id] = total
+            by_group[group_id].append((total, author_id))
+        for shares in self.groups.values():
+            posts = sum(shares.values())
+            for group_id in shares:
+                shares[group_id] /= posts
+        self.group_authors = {
+            group_id: [
+                pk for _, pk in heapq.nlargest(GROUP_CANDIDATES, authors)
+            ]
+            for group_id, authors in by_group.items()
+        }
+        recent = dict(Post.objects.filter(
+            pub_date__gte=timezone.now() - RECENT
+        ).order_by().values_list("author_id").annotate(total=Count("pk")))
+        top = math.log1p(max(recent.values(), default=0)) or 1
+        self.activity = {
+            pk: math.log1p(total) / top for pk, total in recent.items()
+        }
+        self.popular = heapq.nlargest(
+            POPULAR_CANDIDATES, self.activity, key=self.activity.get
+        )
+
+    def interests(self, user_id, follows):
+        """Доли групп в постах пользователя и его авторов."""
+        weights = Counter()
+        for author_id in follows | {user_id}:
+            weights.update(self.groups.get(author_id, {}))
+        total = sum(weights.values())
+        return {group_id: weight / total for group_id, weight in
+                weights.items()} if total else {}
+
+    def score(self, user_id, top_k):
+        """[(оценка, id автора)] лучших кандидатов по убыванию оценки."""
+        follows = self.following.get(user_id, set())
+        two_hop = Counter()
+        for author_id in follows:
+            two_hop.update(self.following.get(author_id, ()))
+        interests = self.interests(user_id, follows)
+        candidates = set(two_hop).union(self.popular, *(
+            self.group_authors.get(group_id, ()) for group_id in interests
+        ))
+        candidates -= follows | {user_id}
+        scored = []
+        for author_id in candidates:
+            shared = sum(
+                interests.get(group_id, 0) * share
+                for group_id, share in self.groups.get(author_id, {}).items()
+            )
+            score = (TWO_HOP_WEIGHT * math.log1p(two_hop[author_id])
+                     + GROUP_WEIGHT * shared
+                     + ACTIVITY_WEIGHT * self.activity.get(author_id, 0))
+            if score > 0:
+                scored.append((score, author_id))
+        return heapq.nlargest(top_k, scored)
+
+
+def _save(graph, user_ids, top_k):
+    rows = [
+        Recommendation(user_id=user_id, author_id=author_id, score=score)
+        for user_id in user_ids
+        for score, author_id in graph.score(user_id, top_k)
+    ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        Recommendation.objects.bulk_create(rows)
+
+
+def build(user_ids=None, top_k=None):
+    """Пересчитывает рекомендации, возвращает число пользователей."""
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    graph = Graph()
+    users = User.objects.order_by("pk").values_list("pk", flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    # Список id, а не iterator(): курсор не должен быть открыт во время
+    # записи (см. timeline._follower_ids).
+    ids = list(users)
+    for start in range(0, len(ids), BATCH_SIZE):
+        _save(graph, ids[start:start + BATCH_SIZE], top_k)
+    return len(ids)
+
+
+def for_request(request, exclude=()):
+    """
+    Авторы для блока «Кого почитать» одним запросом по индексу.
+
+    Подписки, сделанные после расчёта, отсеиваются по множеству из
+    posts.followed, поэтому запрошенных строк хватает с запасом.
+    """
+    if not request.user.is_authenticated:
+        return []
+    skip = followed.for_request(request) | set(exclude)
+    rows = Recommendation.objects.filter(
+        user=request.user
+    ).select_related("author").order_by("-score")
+    return [
+        row.author for row in rows[:settings.RECOMMENDATIONS_TOP_K]
+        if row.author_id not in skip
+    ][:settings.RECOMMENDATIONS_SHOWN]
@@ -0,0 +1,193 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Поиск идёт через бэкенд из настройки SEARCH_BACKEND. Бэкенд получает
+изменения постов и комментариев из сигналов (posts.signals) и отдаёт
+id постов в порядке релевантности. Комментарий находит свой пост, но
+весит меньше совпадения в тексте самого поста.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+class SearchBackend:
+    """Интерфейс бэкенда поиска."""
+
+    def index_posts(self, posts):
+        raise NotImplementedError
+
+    def index_comments(self, comments):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def remove_comment(self, comment_id):
+        raise NotImplementedError
+
+    def search(self, query, limit, after=None):
+        """
+        Возвращает до `limit` пар (score, post_id) по возрастанию score.
+
+        `after` - последняя пара предыдущей страницы.
+        """
+        raise NotImplementedError
+
+    def filter_posts(self, queryset, query):
+        """Оставляет в queryset постов только найденные по запросу."""
+        raise NotImplementedError
+
+    def filter_comments(self, queryset, query):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Строит индекс заново по данным в БД."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    Поиск по виртуальным таблицам FTS5 из миграции 0011_search.
+
+    Совпадения ищутся по инвертированному индексу, так что время
+    запроса зависит от числа найденных строк, а не от размера таблиц.
+    Релевантность - bm25; чем меньше, тем лучше.
+    """
+    POST_TABLE = "posts_post_fts"
+    COMMENT_TABLE = "posts_comment_fts"
+    # Вес совпадения в комментарии относительно совпадения в посте.
+    COMMENT_WEIGHT = 0.5
+
+    @staticmethod
+    def match_expression(query):
+        # Слова запроса ищутся по префиксу и все сразу; синтаксис FTS5
+        # пользователю не доступен, поэтому кавычки и операторы из
+        # запроса не ломают его разбор.
+        words = WORD.findall(query.lower())
+        return " ".join(f'"{word}"*' for word in words)
+
+    def _execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def index_posts(self, posts):
+        rows = [(post.pk, post.text) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.POST_TABLE} WHERE rowid = %s",
+                [(pk,) for pk, _ in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.POST_TABLE} (rowid, text) "
+                f"VALUES (%s, %s)", rows,
+            )
+
+    def index_comments(self, comments):
+        rows = [
+            (comment.pk, comment.text, comment.post_id)
+            for comment in comments
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.COMMENT_TABLE} WHERE rowid = %s",
+                [(pk,) for pk, _, _ in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.COMMENT_TABLE} (rowid, text, post_id) "
+                f"VALUES (%s, %s, %s)", rows,
+            )
+
+    def remove_post(self, post_id):
+        self._execute(
+            f"DELETE FROM {self.POST_TABLE} WHERE rowid = %s", [post_id]
+        )
+
+    def remove_comment(self, comment_id):
+        self._execute(
+            f"DELETE FROM {self.COMMENT_TABLE} WHERE rowid = %s", [comment_id]
+        )
+
+    def search(self, query, limit, after=None):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        params = [expression, self.COMMENT_WEIGHT, expression]
+        having = ""
+        if after is not None:
+            having = ("HAVING score >= %s "
+                      "AND (score > %s OR post_id > %s)")
+            params += [after[0], after[0], after[1]]
+        rows = self._execute(
+            f"""
+            WITH hits (post_id, score) AS (
+                SELECT rowid, bm25({self.POST_TABLE})
+                FROM {self.POST_TABLE}
+                WHERE {self.POST_TABLE} MATCH %s
+                UNION ALL
+                SELECT post_id, bm25({self.COMMENT_TABLE}) * %s
+                FROM {self.COMMENT_TABLE}
+                WHERE {self.COMMENT_TABLE} MATCH %s
+            )
+            SELECT MIN(score) AS score, post_id FROM hits
+            GROUP BY post_id {having}
+            ORDER BY score, post_id
+            LIMIT %s
+            """,
+            params + [limit],
+        )
+        return [(score, post_id) for score, post_id in rows]
+
+    def filter_posts(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {self.POST_TABLE} "
+            f"WHERE {self.POST_TABLE} MATCH %s "
+            f"UNION SELECT post_id FROM {self.COMMENT_TABLE} "
+            f"WHERE {self.COMMENT_TABLE} MATCH %s",
+            [expression, expression],
+        ))
+
+    def filter_comments(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {self.COMMENT_TABLE} "
+            f"WHERE {self.COMMENT_TABLE} MATCH %s",
+            [expression],
+        ))
+
+    def rebuild(self):
+        self._execute(f"DELETE FROM {self.POST_TABLE}")
+        self._execute(
+            f"INSERT INTO {self.POST_TABLE} (rowid, text) "
+            f"SELECT id, text FROM posts_post"
+        )
+        self._execute(f"DELETE FROM {self.COMMENT_TABLE}")
+        self._execute(
+            f"INSERT INTO {self.COMMENT_TABLE} (rowid, text, post_id) "
+            f"SELECT id, text, post_id FROM posts_comment"
+        )
+        self._execute(
+            f"INSERT INTO {self.POST_TABLE} ({self.POST_TABLE}) "
+            f"VALUES ('optimize')"
+        )
+        self._execute(
+            f"INSERT INTO {self.COMMENT_TABLE} ({self.COMMENT_TABLE}) "
+            f"VALUES ('optimize')"
+        )
@@ -0,0 +1,120 @@
+"""
+Генератор синтетических данных для нагрузочных замеров.
+
+Распределения перекошены, как в живой соцсети: подписчики и посты
+сосредоточены у немногих авторов (закон Ципфа), несколько групп
+намного больше остальных, а у «горячих» постов тысячи комментариев.
+Объекты создаются потоком и вставляются пачками через content.bulk_load,
+в памяти остаются только веса распределений.
+"""
+import random
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from .models import Comment, Follow, Group, Post, User
+
+# Показатели степени для распределений Ципфа: чем больше, тем сильнее
+# перекос в пользу первых элементов.
+AUTHOR_SKEW = 1.1
+GROUP_SKEW = 1.2
+COMMENT_SKEW = 1.3
+FOLLOW_SKEW = 1.0
+# Доля постов, опубликованных в группе.
+GROUP_SHARE = 0.7
+# Посты распределены по последнему году.
+PERIOD = timedelta(days=365)
+
+
+class Zipf:
+    """Выбор номера от 0 до n - 1 с весом 1 / (номер + 1) ** skew."""
+
+    def __init__(self, rnd, n, skew):
+        self.rnd = rnd
+        self.cumulative = list(
+            accumulate(1 / (rank + 1) ** skew for rank in range(n))
+        )
+
+    def __call__(self):
+        point = self.rnd.random() * self.cumulative[-1]
+        return bisect(self.cumulative, point)
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def generate(users=1000, groups=30, posts=20000, comments=50000,
+             follows=20000, seed=0):
+    """Отдаёт несохранённые объекты в порядке зависимостей между моделями."""
+    rnd = random.Random(seed)
+    fake = Faker("ru_RU")
+    fake.seed_instance(seed)
+    texts = [fake.paragraph(nb_sentences=rnd.randint(1, 8))
+             for _ in range(500)]
+    first_user, first_group, first_post = (
+        _next_pk(User), _next_pk(Group), _next_pk(Post)
+    )
+    first_comment = _next_pk(Comment)
+    now = timezone.now()
+    start = now - PERIOD
+
+    def pub_date(number):
+        # Даты растут вместе с id, как у настоящих постов.
+        return start + PERIOD * (number + 0.5) / posts
+
+    for number in range(users):
+        pk = first_user + number
+        yield User(
+            pk=pk, username=f"{fake.user_name()}_{pk}",
+            first_name=fake.first_name(), last_name=fake.last_name(),
+            email=fake.email(), password=UNUSABLE_PASSWORD_PREFIX,
+            date_joined=start,
+        )
+    for number in range(groups):
+        yield Group(
+            pk=first_group + number,
+            title=fake.sentence(nb_words=3).rstrip("."),
+            slug=f"group-{first_group + number}",
+            description=rnd.choice(texts),
+        )
+    author = Zipf(rnd, users, AUTHOR_SKEW)
+    group = Zipf(rnd, groups, GROUP_SKEW)
+    for number in range(posts):
+        in_group = groups and rnd.random() < GROUP_SHARE
+        yield Post(
+            pk=first_post + number,
+            text=rnd.choice(texts),
+            pub_date=pub_date(number),
+            author_id=first_user + author(),
+            group_id=first_group + group() if in_group else None,
+        )
+    hot_post = Zipf(rnd, posts, COMMENT_SKEW)
+    for number in range(comments):
+        post = hot_post()
+        yield Comment(
+            pk=first_comment + number,
+            post_id=first_post + post,
+            author_id=first_user + rnd.randrange(users),
+            text=fake.sentence(),
+            created=min(
+                pub_date(post) + timedelta(minutes=rnd.expovariate(1 / 90)),
+                now,
+            ),
+        )
+    followed = Zipf(rnd, users, FOLLOW_SKEW)
+    pairs = set()
+    for _ in range(follows * 3):
+        if len(pairs) >= follows:
+            break
+        pair = (rnd.randrange(users), followed())
+        if pair[0] != pair[1] and pair not in pairs:
+            pairs.add(pair)
+            yield Follow(
+                user_id=first_user + pair[0], author_id=first_user + pair[1]
+            )
@@ -0,0 +1,148 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (counters, feed_cache, followed, live, search, timeline,
+               trending)
+from .models import (Comment, Follow, Group, GroupStats, Post,
+                     post_bulk_create)
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, raw=False, **kwargs):
+    # При переносе поста в другую группу нужно сбросить кэш и старой.
+    if instance.pk and not raw:
+        instance._previous_group_id = sender.objects.filter(
+            pk=instance.pk
+        ).values_list("group_id", flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user(instance.author_id, "post_count", 1)
+        timeline.fan_out(instance)
+        live.bump([instance.author_id])
+    if update_fields is None or "text" in update_fields:
+        search.get_backend().index_posts([instance])
+    scopes = feed_cache.scopes_for(instance)
+    previous_group_id = getattr(instance, "_previous_group_id", None)
+    moved = not created and previous_group_id != instance.group_id
+    if moved and previous_group_id:
+        scopes.append((feed_cache.GROUP, previous_group_id))
+        counters.bump_group(previous_group_id, -1)
+    if (created or moved) and instance.group_id:
+        counters.bump_group(instance.group_id, 1)
+    if created or moved:
+        scopes.append((feed_cache.GROUPS,))
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_bulk_create, sender=Post)
+def posts_bulk_created(sender, objs, **kwargs):
+    since = {}
+    for post in objs:
+        oldest = since.get(post.author_id)
+        if oldest is None or post.pub_date < oldest:
+            since[post.author_id] = post.pub_date
+    for author_id, total in Counter(post.author_id for post in objs).items():
+        counters.bump_user(author_id, "post_count", total)
+    groups = Counter(post.group_id for post in objs if post.group_id)
+    for group_id, total in groups.items():
+        counters.bump_group(group_id, total)
+    for author_id, pub_date in since.items():
+        timeline.fan_out_since(author_id, pub_date)
+    live.bump(since)
+    # На SQLite bulk_create не проставляет pk, поэтому для поиска
+    # новые посты перечитываются так же, как для лент.
+    backend = search.get_backend()
+    if all(post.pk for post in objs):
+        backend.index_posts(objs)
+    else:
+        for author_id, pub_date in since.items():
+            backend.index_posts(Post.objects.filter(
+                author_id=author_id, pub_date__gte=pub_date
+            ).only("text"))
+    scopes = {scope for post in objs for scope in feed_cache.scopes_for(post)}
+    if groups:
+        scopes.add((feed_cache.GROUPS,))
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "post_count", -1)
+    search.get_backend().remove_post(instance.pk)
+    scopes = feed_cache.scopes_for(instance)
+    if instance.group_id:
+        counters.bump_group(instance.group_id, -1)
+        scopes.append((feed_cache.GROUPS,))
+    feed_cache.bump(*scopes)
+
+
+def _comment_post_scopes(comment):
+    if Comment.post.is_cached(comment):
+        post = comment.post
+    else:
+        post = Post.objects.filter(pk=comment.post_id).only(
+            "author_id", "group_id"
+        ).first()
+    return feed_cache.scopes_for(post) if post else ()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, update_fields=None,
+                  **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        trending.comment_added(instance)
+    if update_fields is None or "text" in update_fields:
+        search.get_backend().index_comments([instance])
+    feed_cache.bump(*_comment_post_scopes(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    search.get_backend().remove_comment(instance.pk)
+    feed_cache.bump(*_comment_post_scopes(instance))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, "follower_count", 1)
+        counters.bump_user(instance.user_id, "following_count", 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        followed.changed(instance.user_id)
+        feed_cache.bump((feed_cache.AUTHOR, instance.author_id),
+                        (feed_cache.AUTHOR, instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "follower_count", -1)
+    counters.bump_user(instance.user_id, "following_count", -1)
+    timeline.trim(instance.user_id, instance.author_id)
+    followed.changed(instance.user_id)
+    feed_cache.bump((feed_cache.AUTHOR, instance.author_id),
+                    (feed_cache.AUTHOR, instance.user_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, created=False, **kwargs):
+    # Заголовок и описание группы кэшируются вместе со страницей
+    # и показываются в каталоге групп.
+    if raw:
+        return
+    if created:
+        # Строка нужна сразу: каталог читает группы через GroupStats.
+        GroupStats.objects.get_or_create(group_id=instance.pk)
+    feed_cache.bump((feed_cache.GROUP, instance.pk), (feed_cache.GROUPS,))
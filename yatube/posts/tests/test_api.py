@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_init
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ApiAuthor')
+        cls.reader = User.objects.create_user(username='ApiReader')
+        cls.group = Group.objects.create(
+            title='Группа API',
+            slug='api-group',
+            description='Описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group
+            )
+            for i in range(3)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    @override_settings(SORTING_VALUE=2)
+    def test_feeds_are_paged_by_cursor(self):
+        """Все ленты отдают JSON и листаются курсором"""
+        urls = (
+            (self.guest_client, reverse('api:index')),
+            (self.guest_client, reverse(
+                'api:group_list', kwargs={'slug': self.group.slug}
+            )),
+            (self.guest_client, reverse(
+                'api:profile', kwargs={'username': self.author}
+            )),
+            (self.authorized_client, reverse('api:follow_index')),
+        )
+        expected = [post.pk for post in reversed(self.posts)]
+        for client, url in urls:
+            with self.subTest(url=url):
+                first = client.get(url).json()
+                second = client.get(url, {'cursor': first['next']}).json()
+                ids = [row['id'] for row in first['results']]
+                ids += [row['id'] for row in second['results']]
+                self.assertEqual(ids, expected)
+                self.assertIsNone(second['next'])
+                self.assertIsNotNone(second['previous'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только запрошенные поля"""
+        response = self.guest_client.get(
+            reverse('api:post_detail', args=(self.posts[0].pk,)),
+            {'fields': 'text,author'},
+        )
+        self.assertEqual(
+            response.json(), {'text': 'Пост 0', 'author': 'ApiAuthor'}
+        )
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_comments(self):
+        """Комментарии поста и 404 для несуществующего поста"""
+        response = self.guest_client.get(
+            reverse('api:post_comments', args=(self.posts[0].pk,))
+        )
+        self.assertEqual(response.json()['results'], [{
+            'id': self.comment.pk,
+            'post': self.posts[0].pk,
+            'text': 'Комментарий',
+            'created': response.json()['results'][0]['created'],
+            'author': 'ApiReader',
+        }])
+        response = self.guest_client.get(
+            reverse('api:post_comments', args=(0,))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_conditional_get(self):
+        """Совпавший ETag даёт 304 и для авторизованного клиента"""
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(client=client):
+                url = reverse('api:post_detail', args=(self.posts[1].pk,))
+                etag = client.get(url)['ETag']
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_follow_requires_login(self):
+        """Лента подписок без авторизации - 401"""
+        response = self.guest_client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_api_renders_no_models(self):
+        """Лента API не создаёт объекты моделей"""
+        created = []
+
+        def track(sender, **kwargs):
+            created.append(sender)
+
+        post_init.connect(track)
+        try:
+            self.guest_client.get(reverse('api:index'))
+        finally:
+            post_init.disconnect(track)
+        self.assertNotIn(Post, created)
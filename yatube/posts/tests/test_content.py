@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import Comment, FeedEntry, Follow, Group, Post, user_stats
+
+User = get_user_model()
+
+
+class ContentTransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ExportAuthor')
+        cls.reader = User.objects.create_user(username='ExportReader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='export-group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Перенесённый пост',
+            image='posts/photo.jpg',
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def snapshot(self):
+        return [
+            list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group__slug',
+                'image', 'comment_count',
+            )),
+            list(Comment.objects.order_by('pk').values_list(
+                'pk', 'post_id', 'author__username', 'text', 'created',
+            )),
+            list(Follow.objects.values_list('user_id', 'author_id')),
+        ]
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют данные, ключи и даты"""
+        before = self.snapshot()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'content.ndjson')
+            call_command('export_content', path, stderr=io.StringIO())
+            with open(path, encoding='utf-8') as stream:
+                records = [json.loads(line) for line in stream]
+            self.assertEqual(
+                [record['model'] for record in records],
+                ['auth.user'] * 2 + ['posts.group', 'posts.post',
+                                     'posts.comment', 'posts.follow'],
+            )
+            User.objects.all().delete()
+            Group.objects.all().delete()
+            self.assertFalse(Post.objects.exists())
+            call_command(
+                'import_content', path, batch_size=1,
+                stdout=io.StringIO(), stderr=io.StringIO(),
+            )
+        self.assertEqual(self.snapshot(), before)
+        author = User.objects.get(username='ExportAuthor')
+        self.assertEqual(user_stats(author).follower_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(post=self.post).exists())
+        self.assertFalse(author.has_usable_password())
+
+    def test_passwords_exported_only_on_request(self):
+        """Хэши паролей выгружаются только с флагом --with-passwords"""
+        self.author.set_password('секрет-123')
+        self.author.save()
+        for options, exported in (({}, False), ({'with_passwords': True},
+                                                True)):
+            with self.subTest(options=options):
+                out = io.StringIO()
+                with mock.patch('sys.stdout', out):
+                    call_command('export_content', stderr=io.StringIO(),
+                                 **options)
+                users = [
+                    record['fields'] for record in map(
+                        json.loads, out.getvalue().splitlines()
+                    ) if record['model'] == 'auth.user'
+                ]
+                self.assertEqual(
+                    any('password' in fields for fields in users), exported
+                )
+
+    def test_broken_line(self):
+        """Битая строка останавливает загрузку с номером строки"""
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as stream:
+            stream.write('{"model": "posts.group"}\n')
+            stream.flush()
+            with self.assertRaisesMessage(CommandError, 'Строка 1'):
+                call_command('import_content', stream.name,
+                             stderr=io.StringIO())
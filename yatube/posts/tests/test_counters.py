@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserStats, user_stats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='CountedAuthor')
+        cls.reader = User.objects.create_user(username='CountedReader')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def stats(self, user):
+        return user_stats(User.objects.get(pk=user.pk))
+
+    def test_post_and_follow_counters(self):
+        """Счётчики постов и подписок меняются при создании и удалении"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Пачка') for _ in range(3)
+        ])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).post_count, 4)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.delete()
+        Follow.objects.all().delete()
+        self.assertEqual(self.stats(self.author).post_count, 3)
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_comment_counter_survives_post_edit(self):
+        """Редактирование поста не затирает счётчик комментариев"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Раз')
+        post.text = 'Отредактированный пост'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        post.comments.get().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Раз')
+        UserStats.objects.all().delete()
+        Post.objects.update(comment_count=10)
+        call_command('recount', batch_size=1, stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+    def test_post_detail_does_not_count_posts(self):
+        """Страница поста берёт число постов автора из счётчика"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with self.assertNumQueries(4):
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.context['post_count'], 1)
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import followed
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowedAuthorsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='FollowedReader')
+        cls.author = User.objects.create_user(username='FollowedAuthor')
+        cls.other = User.objects.create_user(username='FollowedOther')
+        Follow.objects.create(user=cls.reader, author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_views_reset_cached_set(self):
+        """Подписка и отписка сбрасывают множество, оно перечитывается"""
+        self.assertEqual(followed.author_ids(self.reader.pk), {self.other.pk})
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        with self.assertNumQueries(1):
+            ids = followed.author_ids(self.reader.pk)
+        self.assertEqual(ids, {self.other.pk, self.author.pk})
+        with self.assertNumQueries(0):
+            followed.author_ids(self.reader.pk)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.other.username,))
+        )
+        ids = followed.author_ids(self.reader.pk)
+        self.assertEqual(ids, {self.author.pk})
+        self.assertEqual(
+            set(Follow.objects.filter(user=self.reader).values_list(
+                'author_id', flat=True
+            )),
+            ids,
+        )
+
+    def test_profile_uses_cached_set(self):
+        """Профиль берёт состояние подписки из множества в кэше"""
+        url = reverse('posts:profile', args=(self.other.username,))
+        response = self.authorized_client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertIn(self.other.pk, response.context['following_ids'])
+        self.assertNotIn(self.author.pk, response.context['following_ids'])
+        cache.delete(f'following:{self.reader.pk}')
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.context['following'])
+
+    def test_writes_ignore_stale_set(self):
+        """Устаревшее множество в кэше не мешает подписке и отписке"""
+        key = f'following:{self.reader.pk}'
+        cache.set(key, frozenset({self.author.pk}))
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        cache.set(key, frozenset())
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.other.username,))
+        )
+        self.assertFalse(Follow.objects.filter(
+            user=self.reader, author=self.other
+        ).exists())
@@ -0,0 +1,97 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import feed_cache
+from ..models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='GroupAuthor')
+        cls.busy, cls.fresh, cls.empty = (
+            Group.objects.create(
+                title=title, slug=f'group-{number}', description='Описание'
+            )
+            for number, title in enumerate(('Бета', 'Альфа', 'Гамма'))
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author, group=cls.busy, text=f'Пост {number}')
+            for number in range(3)
+        ])
+        cls.latest = Post.objects.create(
+            author=cls.author, group=cls.fresh, text='Свежий пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def directory(self, sort=None):
+        url = reverse('posts:group_index')
+        if sort:
+            url += f'?sort={sort}'
+        response = self.guest_client.get(url)
+        return [stats.group for stats in response.context['page_obj']]
+
+    def test_stats_follow_post_writes(self):
+        """Счётчик и последний пост группы меняются вместе с постами"""
+        self.assertEqual(self.stats(self.busy).post_count, 3)
+        self.assertEqual(self.stats(self.fresh).last_post, self.latest)
+        self.assertEqual(self.stats(self.empty).post_count, 0)
+        self.latest.group = self.busy
+        self.latest.save()
+        self.assertEqual(self.stats(self.busy).post_count, 4)
+        self.assertEqual(self.stats(self.busy).last_post, self.latest)
+        self.assertEqual(self.stats(self.fresh).post_count, 0)
+        self.assertIsNone(self.stats(self.fresh).last_post)
+        self.latest.delete()
+        stats = self.stats(self.busy)
+        self.assertEqual(stats.post_count, 3)
+        self.assertEqual(
+            stats.last_post, Post.objects.filter(group=self.busy).first()
+        )
+
+    def test_directory_sorting(self):
+        """Каталог сортируется по активности, числу записей и названию"""
+        orders = {
+            None: [self.fresh, self.busy, self.empty],
+            'posts': [self.busy, self.fresh, self.empty],
+            'title': [self.fresh, self.busy, self.empty],
+        }
+        for sort, expected in orders.items():
+            with self.subTest(sort=sort):
+                self.assertEqual(self.directory(sort), expected)
+
+    def test_cache_invalidated_by_new_posts_only(self):
+        """Версия каталога меняется от новых постов, но не от правки"""
+        self.assertEqual(self.directory()[0], self.fresh)
+        version = feed_cache.version(feed_cache.GROUPS)
+        self.latest.text = 'Правка'
+        self.latest.save()
+        self.assertEqual(feed_cache.version(feed_cache.GROUPS), version)
+        Post.objects.create(author=self.author, group=self.empty, text='Пост')
+        response = self.guest_client.get(reverse('posts:group_index'))
+        self.assertContains(response, 'Записей: 1')
+        self.assertEqual(response.context['page_obj'][0].group, self.empty)
+
+    def test_recount_fixes_stats(self):
+        """Команда recount восстанавливает разошедшиеся счётчики групп"""
+        GroupStats.objects.filter(group=self.busy).update(
+            post_count=0, last_post=None, last_post_date=None
+        )
+        GroupStats.objects.filter(group=self.fresh).delete()
+        call_command('recount', stdout=io.StringIO())
+        self.assertEqual(self.stats(self.busy).post_count, 3)
+        self.assertEqual(self.stats(self.fresh).last_post, self.latest)
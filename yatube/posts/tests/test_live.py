@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class LivePostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='LiveAuthor')
+        cls.other = User.objects.create_user(username='LiveOther')
+        cls.reader = User.objects.create_user(username='LiveReader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text='Первый')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def live_state(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.context['live']
+
+    def poll(self, client, state):
+        response = client.get(reverse('api:live'), {
+            'feed': state['feed'],
+            'after': state['after'],
+            'version': state['version'],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Retry-After'], str(settings.LIVE_POLL_INTERVAL)
+        )
+        return response.json()
+
+    def test_index_new_posts(self):
+        """Новые посты на главной считаются после смены версии"""
+        state = self.live_state(self.authorized_client, reverse('posts:index'))
+        self.assertEqual(state['after'], self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.poll(self.guest_client, state)['new'], 0)
+        Post.objects.create(author=self.author, text='Второй')
+        Post.objects.create(author=self.other, text='Третий')
+        data = self.poll(self.guest_client, state)
+        self.assertEqual(data['new'], 2)
+        self.assertNotEqual(data['version'], state['version'])
+
+    def test_follow_new_posts(self):
+        """Лента подписок реагирует только на посты авторов из подписок"""
+        state = self.live_state(
+            self.authorized_client, reverse('posts:follow_index')
+        )
+        Post.objects.create(author=self.other, text='Чужой')
+        self.assertEqual(self.poll(self.authorized_client, state)['new'], 0)
+        Post.objects.create(author=self.author, text='Свой')
+        self.assertEqual(self.poll(self.authorized_client, state)['new'], 1)
+
+    def test_only_first_page(self):
+        """На страницах дальше первой уведомлений нет"""
+        state = self.live_state(
+            self.authorized_client, reverse('posts:index') + '?page=2'
+        )
+        self.assertIsNone(state)
+
+    def test_errors(self):
+        """Неизвестная лента - 400, лента подписок без входа - 401"""
+        url = reverse('api:live')
+        cases = (
+            ({'feed': 'nope'}, 400),
+            ({'after': 'x'}, 400),
+            ({'feed': 'follow'}, 401),
+        )
+        for params, status in cases:
+            with self.subTest(params=params):
+                response = self.guest_client.get(url, params)
+                self.assertEqual(response.status_code, status)
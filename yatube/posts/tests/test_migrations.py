@@ -0,0 +1,90 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Данные создаются в состоянии `migrate_from`, проверяются после."""
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes()
+        executor.migrate([self.migrate_from])
+        self.prepare(executor.loader.project_state(
+            [self.migrate_from]
+        ).apps)
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([self.migrate_to])
+        self.apps = executor.loader.project_state([self.migrate_to]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.latest)
+
+    def prepare(self, apps):
+        raise NotImplementedError
+
+
+class FeedEntryBackfillTests(MigrationTestCase):
+    migrate_from = ('posts', '0007_auto_20220523_2205')
+    migrate_to = ('posts', '0008_feedentry')
+
+    def prepare(self, apps):
+        User = apps.get_model('auth', 'User')
+        Post = apps.get_model('posts', 'Post')
+        Follow = apps.get_model('posts', 'Follow')
+        self.reader = User.objects.create(username='MigrationReader').pk
+        author = User.objects.create(username='MigrationAuthor')
+        self.post = Post.objects.create(author=author, text='Пост').pk
+        Follow.objects.create(user_id=self.reader, author=author)
+
+    def test_existing_follows_get_feeds(self):
+        """Миграция раскладывает посты по лентам существующих подписок"""
+        FeedEntry = self.apps.get_model('posts', 'FeedEntry')
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user_id', 'post_id')),
+            [(self.reader, self.post)],
+        )
+
+
+class CountersBackfillTests(MigrationTestCase):
+    migrate_from = ('posts', '0008_feedentry')
+    migrate_to = ('posts', '0009_counters')
+
+    def prepare(self, apps):
+        User = apps.get_model('auth', 'User')
+        Post = apps.get_model('posts', 'Post')
+        Comment = apps.get_model('posts', 'Comment')
+        Follow = apps.get_model('posts', 'Follow')
+        self.author = User.objects.create(username='CounterAuthor').pk
+        self.reader = User.objects.create(username='CounterReader').pk
+        self.idle = User.objects.create(username='CounterIdle').pk
+        post = Post.objects.create(author_id=self.author, text='Пост')
+        Post.objects.create(author_id=self.author, text='Ещё пост')
+        self.post = post.pk
+        for number in range(2):
+            Comment.objects.create(
+                post=post, author_id=self.reader, text=f'Ответ {number}'
+            )
+        Follow.objects.create(user_id=self.reader, author_id=self.author)
+
+    def test_existing_data_gets_counters(self):
+        """Миграция заполняет счётчики пользователей и комментариев"""
+        UserStats = self.apps.get_model('posts', 'UserStats')
+        Post = self.apps.get_model('posts', 'Post')
+        stats = {
+            row[0]: row[1:] for row in UserStats.objects.values_list(
+                'user_id', 'post_count', 'follower_count', 'following_count'
+            )
+        }
+        self.assertEqual(stats, {
+            self.author: (2, 1, 0),
+            self.reader: (0, 0, 1),
+        })
+        self.assertEqual(
+            Post.objects.get(pk=self.post).comment_count, 2
+        )
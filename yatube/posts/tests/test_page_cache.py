@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='CachedAuthor')
+        cls.reader = User.objects.create_user(username='CachedReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cached-group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Закэшированный пост',
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_cached_page_served_without_queries(self):
+        """Повторный анонимный запрос не обращается к БД"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertEqual(first.content, second.content)
+                self.assertEqual(first['ETag'], second['ETag'])
+                self.assertNotIn('Last-Modified', second)
+
+    def test_conditional_get_returns_not_modified(self):
+        """Совпавший ETag даёт 304, новый пост - новую страницу"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Новый пост')
+
+    def test_if_modified_since_does_not_hide_edits(self):
+        """Правка и комментарий не теряются при одном If-Modified-Since"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_unknown_params_share_cache_entry(self):
+        """Посторонние параметры не создают новых записей в кэше"""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url + '?x=1')
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url + '?x=2&utm=3')
+        self.assertEqual(first.content, second.content)
+        page = self.guest_client.get(url + '?page=1')
+        self.assertIsNotNone(page.context)
+
+    def test_page_params_are_normalized(self):
+        """Номер страницы приводится к числу, мусор не кэшируется"""
+        url = reverse('posts:index')
+        self.guest_client.get(url + '?page=1')
+        with self.assertNumQueries(0):
+            self.guest_client.get(url + '?page=01')
+        for query in ('?page=abc', '?page=0', '?cursor=мусор'):
+            with self.subTest(query=query):
+                self.guest_client.get(url + query)
+                response = self.guest_client.get(url + query)
+                self.assertIsNotNone(response.context)
+        # Фрагмент ленты тоже хранится под номером показанной страницы,
+        # а не под строкой из запроса.
+        entries = len(cache._cache)
+        for junk in ('x', 'y', 'z'):
+            self.guest_client.get(url + f'?page={junk}')
+        self.assertEqual(len(cache._cache), entries)
+
+    def test_follow_updates_cached_profile(self):
+        """Подписка сбрасывает закэшированный профиль автора"""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.assertContains(self.guest_client.get(url), 'Подписчиков: 0')
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertContains(self.guest_client.get(url), 'Подписчиков: 1')
+
+    def test_authorized_requests_are_not_cached(self):
+        """Авторизованный пользователь получает страницу из view"""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, self.reader.username)
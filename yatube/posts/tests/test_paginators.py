@@ -0,0 +1,178 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import CountCachePaginator, CursorPaginator, decode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='CursorAuthor')
+        cls.COUNT = 25
+        Post.objects.bulk_create([Post(
+            author=cls.user,
+            text=f'Пост номер {number}',
+        ) for number in range(cls.COUNT)])
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk(self, direction='next_cursor', token=None):
+        paginator = CursorPaginator(Post.objects.all(), settings.SORTING_VALUE)
+        page = paginator.get_cursor_page(token)
+        return page, getattr(paginator, direction)
+
+    def test_pages_cover_feed_without_gaps(self):
+        """Проход по курсорам возвращает все посты ровно один раз"""
+        seen = []
+        page, token = self.walk()
+        seen.extend(post.pk for post in page)
+        while token:
+            page, token = self.walk(token=token)
+            seen.extend(post.pk for post in page)
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу"""
+        first_page, token = self.walk()
+        second_page = CursorPaginator(
+            Post.objects.all(), settings.SORTING_VALUE
+        )
+        second_page.get_cursor_page(token)
+        page, _ = self.walk(token=second_page.previous_cursor)
+        self.assertEqual(list(page), list(first_page))
+        self.assertFalse(page.has_previous())
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Битый курсор отдаёт первую страницу"""
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page, _ = self.walk(token='not-a-cursor')
+        self.assertEqual(
+            [post.pk for post in page],
+            self.expected[:settings.SORTING_VALUE]
+        )
+
+    def test_feeds_use_cursor_and_numbered_opt_in(self):
+        """Ленты работают по курсору, ?page= включает нумерацию"""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        response = self.guest_client.get(url)
+        paginator = response.context['page_obj'].paginator
+        self.assertIsInstance(paginator, CursorPaginator)
+        response = self.guest_client.get(
+            url, {'cursor': paginator.next_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected[settings.SORTING_VALUE:2 * settings.SORTING_VALUE]
+        )
+        response = self.guest_client.get(url, {'page': 3})
+        self.assertNotIsInstance(
+            response.context['page_obj'].paginator, CursorPaginator
+        )
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+
+@override_settings(PAGINATOR_EXACT_COUNT_LIMIT=5)
+class CountCachePaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='CountedAuthor')
+        Post.objects.bulk_create([Post(
+            author=cls.user,
+            text=f'Пост номер {number}',
+        ) for number in range(25)])
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, **kwargs):
+        return CountCachePaginator(
+            Post.objects.all(), settings.SORTING_VALUE,
+            count_key='test-count', **kwargs
+        )
+
+    def test_small_counts_are_exact(self):
+        """До порога число постов считается точно"""
+        with self.settings(PAGINATOR_EXACT_COUNT_LIMIT=100):
+            paginator = self.paginator()
+            self.assertEqual(paginator.count, 25)
+            self.assertFalse(paginator.approximate)
+        self.assertIsNone(cache.get('test-count'))
+
+    def test_large_count_is_cached_and_approximate(self):
+        """Выше порога число берётся из кэша и помечается приблизительным"""
+        self.assertEqual(self.paginator().count, 25)
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Ещё') for _ in range(10)
+        ])
+        paginator = self.paginator()
+        with self.assertNumQueries(1):
+            page = paginator.get_page(3)
+        self.assertTrue(paginator.approximate)
+        self.assertEqual(len(page), settings.SORTING_VALUE)
+        self.assertTrue(page.has_next())
+        self.assertEqual(len(paginator.get_page(4)), 5)
+
+    def test_capped_count_while_estimate_is_computed(self):
+        """Пока оценку считает другой запрос, выводится порог"""
+        cache.add('test-count:lock', True)
+        paginator = self.paginator()
+        with self.assertNumQueries(2):
+            page = paginator.get_page(2)
+            self.assertEqual(len(page), settings.SORTING_VALUE)
+        self.assertTrue(paginator.capped)
+        self.assertEqual(paginator.count, 5)
+        self.assertTrue(page.has_next())
+        self.assertIsNone(cache.get('test-count'))
+
+    def test_page_past_end_falls_back_to_last(self):
+        """Номер за концом даёт последнюю страницу, как get_page"""
+        self.paginator().count
+        page = self.paginator().get_page(50)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+        # Завышенная оценка пересчитывается точно.
+        cache.set('test-count', 100)
+        paginator = self.paginator()
+        page = paginator.get_page(10)
+        self.assertEqual(page.number, 3)
+        self.assertFalse(paginator.approximate)
+        self.assertEqual(cache.get('test-count'), 25)
+
+    def test_count_or_key_is_required(self):
+        """Без счётчика и ключа кэша полный COUNT(*) негде хранить"""
+        with self.assertRaises(ValueError):
+            CountCachePaginator(Post.objects.all(), settings.SORTING_VALUE)
+
+    def test_counter_table_count_is_exact(self):
+        """Переданный счётчик используется без запросов COUNT"""
+        paginator = self.paginator(count=25)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(3)
+            self.assertEqual(len(page), 5)
+        self.assertFalse(paginator.approximate)
+
+    def test_numbered_page_shows_approximate_total(self):
+        """Шаблон выводит «из ~N» для приблизительного числа страниц"""
+        response = Client().get(reverse('posts:index'), {'page': 2})
+        self.assertContains(response, 'Страница 2 из ~3')
+        cache.clear()
+        cache.add('feed-count:global:lock', True)
+        response = Client().get(reverse('posts:index'), {'page': 2})
+        self.assertContains(response, 'Страница 2, записей больше 5')
+        self.assertNotContains(response, 'Последняя')
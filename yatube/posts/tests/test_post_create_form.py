@@ -1,3 +1,4 @@
+import io
 import shutil
 import tempfile
 
@@ -6,7 +7,9 @@ from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from .. import thumbnails
 from ..models import Group, Post
 
 User = get_user_model()
@@ -93,22 +96,24 @@ class PostCreateFormTests(TestCase):
         response = self.authorized_client.post(
             reverse('posts:post_create'),
             data=form_data,
-            follow=True
         )
-        self.assertRedirects(response, reverse(
+        profile = reverse(
             'posts:profile',
             kwargs={'username': self.user.username}
         )
-        )
+        self.assertRedirects(response, profile, fetch_redirect_response=False)
         self.assertEqual(Post.objects.count(), posts_count + 1)
         self.assertTrue(
             Post.objects.filter(
                 author=self.user,
                 group__id=form_data['group'],
                 text=form_data['text'],
-                image='posts/small.gif'
+                image='posts/small.jpg'
             ).exists()
         )
+        # Пул строит миниатюры после коммита, которого в TestCase нет.
+        thumbnails.generate('posts/small.jpg')
+        self.assertEqual(self.authorized_client.get(profile).status_code, 200)
 
     def test_post_edit(self):
         """Тестирование отправки валидной формы при редактировании поста"""
@@ -134,3 +139,30 @@ class PostCreateFormTests(TestCase):
                 text=form_data['text'],
             ).exists()
         )
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIDE=100)
+    def test_uploaded_image_is_normalized(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет EXIF"""
+        source = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90 градусов
+        exif[0x010F] = 'Camera'
+        Image.new('RGB', (400, 200), 'red').save(
+            source, 'JPEG', exif=exif.tobytes()
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с фото',
+                'image': SimpleUploadedFile(
+                    'photo.jpeg', source.getvalue(), 'image/jpeg'
+                ),
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get(text='Пост с фото')
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertEqual(len(image.getexif()), 0)
+            self.assertTrue(image.info.get('progressive'))
@@ -0,0 +1,198 @@
+import json
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.log_format import JsonFormatter
+from core.middleware import QueryBudgetExceeded
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+DB_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+# Ленты, у которых проверяются и следующие страницы.
+FEEDS = (
+    'posts:index', 'posts:group_list', 'posts:profile', 'posts:follow_index',
+    'api:index', 'api:group_list', 'api:profile', 'api:follow_index',
+)
+
+
+@override_settings(QUERY_BUDGET_RAISE=True, SERVER_TIMING=True)
+class QueryBudgetTests(TestCase):
+    """Страницы укладываются в бюджет SQL-запросов из QUERY_BUDGETS."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='BudgetAuthor')
+        cls.reader = User.objects.create_user(username='BudgetReader')
+        groups = [
+            Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'budget-group-{number}',
+                description='Описание',
+            )
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        # Больше SORTING_VALUE постов в каждой ленте: проверяются и
+        # вторые страницы.
+        for number in range(33):
+            post = Post.objects.create(
+                author=cls.author if number % 3 else cls.reader,
+                group=groups[number % 3],
+                text=f'Пост про погоду {number}',
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f'Комментарий {number}'
+            )
+        cls.group = groups[0]
+        cls.post = post
+        post_kwargs = {'post_id': cls.post.pk}
+        own_post = Post.objects.filter(author=cls.reader).first()
+        cls.pages = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_index': reverse('posts:group_index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': cls.author.username}
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs=post_kwargs
+            ),
+            'posts:post_comments': reverse(
+                'posts:post_comments', kwargs=post_kwargs
+            ),
+            'posts:search': reverse('posts:search') + '?q=погод',
+            'posts:trending': reverse('posts:trending'),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:post_create': reverse('posts:post_create'),
+            # Форму правки получает автор поста, остальных перенаправляет.
+            'posts:post_edit': reverse(
+                'posts:post_edit', args=(own_post.pk,)
+            ),
+            'api:index': reverse('api:index'),
+            'api:group_list': reverse(
+                'api:group_list', kwargs={'slug': cls.group.slug}
+            ),
+            'api:profile': reverse(
+                'api:profile', kwargs={'username': cls.author.username}
+            ),
+            'api:follow_index': reverse('api:follow_index'),
+            'api:live': reverse('api:live'),
+            'api:post_detail': reverse('api:post_detail', kwargs=post_kwargs),
+            'api:post_comments': reverse(
+                'api:post_comments', kwargs=post_kwargs
+            ),
+            'users:signup': reverse('users:signup'),
+            'users:login': reverse('users:login'),
+        }
+        cls.writes = {
+            'posts:post_create': (
+                reverse('posts:post_create'),
+                {'text': 'Новый пост', 'group': cls.group.pk},
+            ),
+            'posts:post_edit': (
+                reverse('posts:post_edit', args=(own_post.pk,)),
+                {'text': 'Правка', 'group': cls.group.pk},
+            ),
+            'posts:add_comment': (
+                reverse('posts:add_comment', args=(cls.post.pk,)),
+                {'text': 'Комментарий'},
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_every_budget_is_checked(self):
+        """Для каждого бюджета в настройках есть страница в тесте"""
+        self.assertEqual(set(settings.QUERY_BUDGETS), set(self.pages))
+        self.assertEqual(set(settings.WRITE_QUERY_BUDGETS), set(self.writes))
+
+    def test_writes_within_budget(self):
+        """Запись поста и комментария не превышает бюджет записи"""
+        for url_name, (url, data) in self.writes.items():
+            with self.subTest(url_name=url_name):
+                cache.clear()
+                response = self.authorized_client.post(url, data)
+                self.assertEqual(response.status_code, 302)
+                queries = DB_TIMING.search(response['Server-Timing'])
+                self.assertLessEqual(
+                    int(queries.group(1)),
+                    settings.WRITE_QUERY_BUDGETS[url_name],
+                )
+
+    def next_pages(self, client):
+        """Вторые страницы лент: ?page=2 и курсор с первой страницы."""
+        for url_name in FEEDS:
+            url = self.pages[url_name]
+            response = client.get(url)
+            if response.status_code != 200:
+                continue
+            if url_name.startswith('api:'):
+                cursor = response.json()['next']
+            else:
+                yield url_name, f'{url}?page=2'
+                cursor = response.context['page_obj'].paginator.next_cursor
+            self.assertIsNotNone(cursor, url_name)
+            yield url_name, f'{url}?cursor={cursor}'
+
+    def test_pages_within_budget(self):
+        """Страницы с холодным кэшем не превышают бюджет запросов"""
+        clients = (
+            ('guest', self.guest_client),
+            ('reader', self.authorized_client),
+        )
+        for who, client in clients:
+            pages = [*self.pages.items(), *self.next_pages(client)]
+            for url_name, url in pages:
+                with self.subTest(url=url, client=who):
+                    cache.clear()
+                    response = client.get(url)
+                    self.assertIn(response.status_code, (200, 302, 401))
+                    queries = DB_TIMING.search(response['Server-Timing'])
+                    self.assertLessEqual(
+                        int(queries.group(1)),
+                        settings.QUERY_BUDGETS[url_name],
+                    )
+
+    def test_budget_exceeded(self):
+        """Превышение бюджета поднимает исключение"""
+        with self.settings(QUERY_BUDGETS={'posts:index': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.guest_client.get(self.pages['posts:index'])
+
+    def test_budget_exceeded_is_logged(self):
+        """Без QUERY_BUDGET_RAISE превышение только пишется в лог"""
+        budgets = {'posts:index': 0}
+        with self.settings(QUERY_BUDGETS=budgets, QUERY_BUDGET_RAISE=False):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                response = self.guest_client.get(self.pages['posts:index'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:index', logs.output[0])
+
+    def test_request_log_is_structured(self):
+        """Замер запроса пишется в лог JSON-строкой с полями extra"""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.guest_client.get(self.pages['posts:index'])
+        data = json.loads(JsonFormatter().format(logs.records[0]))
+        self.assertEqual(data['logger'], 'core.middleware')
+        self.assertEqual(data['url_name'], 'posts:index')
+        self.assertEqual(data['status'], 200)
+        self.assertIsInstance(data['queries'], int)
+
+    def test_server_timing_only_when_enabled(self):
+        """Без SERVER_TIMING заголовок не отдаётся"""
+        with self.settings(SERVER_TIMING=False):
+            response = self.guest_client.get(self.pages['posts:index'])
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,96 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный проход таблицы без индекса или сортировка во временном B-дереве.
+BAD_PLAN = re.compile(r'^SCAN (TABLE )?\S+$|USE TEMP B-TREE')
+# Страница по курсору должна искать по индексу, а не листать его с начала.
+BAD_CURSOR_PLAN = re.compile(r'^SCAN |USE TEMP B-TREE')
+
+
+class QueryPlanTests(TestCase):
+    """Каждый запрос ленты должен идти по индексу и без сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='PlanAuthor')
+        cls.reader = User.objects.create_user(username='PlanReader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='plan-group',
+            description='Описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(25):
+            post = Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Пост {number}',
+            )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.reader, text=f'Ком {number}')
+            for number in range(25)
+        )
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def plans(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlans(self, url, **params):
+        pattern = BAD_CURSOR_PLAN if params else BAD_PLAN
+        for sql, plan in self.plans(url, **params):
+            with self.subTest(url=url, sql=sql):
+                bad = [step for step in plan if pattern.search(step)]
+                self.assertEqual(bad, [], f'{sql}\n{plan}')
+
+    def next_cursor(self, url):
+        response = self.authorized_client.get(url)
+        return response.context['page_obj'].paginator.next_cursor
+
+    def test_feed_query_plans(self):
+        """Ленты и страница поста не сканируют таблицы целиком"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.assertIndexedPlans(url)
+            self.assertIndexedPlans(url, cursor=self.next_cursor(url))
+        self.assertIndexedPlans(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_comment_query_plans(self):
+        """Порции комментариев выбираются по индексу comment_post_created"""
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        self.assertIndexedPlans(url)
+        response = self.authorized_client.get(url)
+        cursor = response.context['comments'].paginator.next_cursor
+        self.assertIsNotNone(cursor)
+        self.assertIndexedPlans(url, cursor=cursor)
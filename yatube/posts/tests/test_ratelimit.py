@@ -0,0 +1,85 @@
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import ratelimit
+
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Limited')
+        cls.other = User.objects.create_user(username='Neighbour')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{number}')
+            for number in range(3)
+        ]
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    @override_settings(RATE_LIMITS={'add_comment': {'user': (2, 60)}})
+    def test_comments_limited_per_user(self):
+        """Лишний комментарий получает 429 с Retry-After и не сохраняется"""
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        for number in range(3):
+            response = self.authorized_client.post(
+                url, {'text': f'Комментарий {number}'}
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(self.authorized_client.get(url).status_code, 302)
+
+    @override_settings(RATE_LIMITS={'profile_follow': {'ip': (2, 60)}})
+    def test_follows_limited_per_ip(self):
+        """Лимит по IP действует на всех пользователей с этого адреса"""
+        other_client = Client()
+        other_client.force_login(self.other)
+        clients = (self.authorized_client, other_client, other_client)
+        statuses = [
+            client.get(reverse(
+                'posts:profile_follow', args=(author.username,)
+            )).status_code
+            for client, author in zip(clients, self.authors)
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+        self.assertEqual(Follow.objects.count(), 2)
+
+    def test_window_slides(self):
+        """Вклад прошлого окна затухает постепенно, а не обнуляется"""
+        request = mock.Mock(META={'REMOTE_ADDR': '10.0.0.1'})
+        rules = {'ip': (2, 60)}
+
+        def check_at(moment):
+            with mock.patch.object(ratelimit.time, 'time',
+                                   return_value=moment):
+                return ratelimit.check(request, 'test', rules)
+
+        self.assertEqual([check_at(600), check_at(600)], [0, 0])
+        self.assertEqual(check_at(600), 60)
+        self.assertEqual(check_at(630), 30)
+        # В следующем окне прошлые 2 запроса весят 2 * (1 - 30/60) = 1,
+        # а через секунду - уже меньше, и место для запроса освобождается.
+        self.assertEqual(check_at(690), 0)
+        self.assertEqual(check_at(690), 1)
+        self.assertEqual(check_at(691), 0)
+
+    def test_benchmark_command(self):
+        """Команда benchmark_ratelimit сообщает время одной проверки"""
+        out = io.StringIO()
+        call_command('benchmark_ratelimit', checks=100, stdout=out)
+        self.assertIn('мкс на проверку', out.getvalue())
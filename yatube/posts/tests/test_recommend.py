@@ -0,0 +1,66 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, Recommendation
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='RecReader')
+        cls.friend = User.objects.create_user(username='RecFriend')
+        cls.two_hop = User.objects.create_user(username='RecTwoHop')
+        cls.same_group = User.objects.create_user(username='RecSameGroup')
+        cls.stranger = User.objects.create_user(username='RecStranger')
+        group = Group.objects.create(
+            title='Группа', slug='rec-group', description='Описание'
+        )
+        other_group = Group.objects.create(
+            title='Другая', slug='rec-other', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.two_hop)
+        Post.objects.create(author=cls.friend, group=group, text='Пост')
+        Post.objects.create(author=cls.same_group, group=group, text='Пост')
+        Post.objects.create(author=cls.stranger, group=other_group,
+                            text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_build_scores_candidates(self):
+        """Два шага по графу и общие группы поднимают кандидата выше"""
+        call_command('build_recommendations', stdout=io.StringIO())
+        authors = list(Recommendation.objects.filter(
+            user=self.reader
+        ).order_by('-score').values_list('author__username', flat=True))
+        self.assertEqual(authors[:2], ['RecSameGroup', 'RecTwoHop'])
+        self.assertNotIn('RecFriend', authors)
+        self.assertNotIn('RecReader', authors)
+
+    def test_pages_show_recommendations(self):
+        """Лента подписок и профиль показывают рекомендации без подписок"""
+        call_command('build_recommendations', stdout=io.StringIO())
+        Follow.objects.create(user=self.reader, author=self.same_group)
+        pages = (
+            (reverse('posts:follow_index'), set()),
+            (reverse('posts:profile', args=(self.two_hop.username,)),
+             {self.two_hop}),
+        )
+        for url, hidden in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                shown = response.context['recommendations']
+                self.assertIn(self.stranger, shown)
+                self.assertNotIn(self.same_group, shown)
+                self.assertFalse(hidden & set(shown))
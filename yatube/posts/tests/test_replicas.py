@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import resolve, reverse
+
+from core.middleware import ReplicaRoutingMiddleware
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ReplicaAuthor')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def route(self, request, write=False):
+        """Откуда представление прочитало бы пост во время запроса."""
+        used = []
+
+        def view(request):
+            if write:
+                router.db_for_write(Post)
+            used.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        def get_response(request):
+            request.resolver_match = resolve(request.path)
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(request)
+        return used[0]
+
+    def test_routing(self):
+        """Из реплики читают только GET-запросы к лентам без записи"""
+        factory = RequestFactory()
+        index = reverse('posts:index')
+        pinned = factory.get(index)
+        pinned.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        cases = (
+            ('GET ленты', factory.get(index), False, 'replica'),
+            ('GET API', factory.get(reverse('api:index')), False, 'replica'),
+            ('после записи', factory.get(index), True, 'default'),
+            ('с cookie', pinned, False, 'default'),
+            ('POST', factory.post(index), False, 'default'),
+            ('вход', factory.get(reverse('users:login')), False, 'default'),
+        )
+        for name, request, write, alias in cases:
+            with self.subTest(name=name):
+                self.assertEqual(self.route(request, write), alias)
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_pins_to_primary(self):
+        """После записи пользователь получает cookie основной БД"""
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий'},
+        )
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        with self.settings(REPLICA_DATABASES=[]):
+            response = client.post(
+                reverse('posts:add_comment', args=(self.post.pk,)),
+                {'text': 'Ещё комментарий'},
+            )
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_follow_pins_profile(self):
+        """Подписка по GET закрепляет чтение профиля за основной БД"""
+        reader = User.objects.create_user(username='ReplicaReader')
+        client = Client()
+        client.force_login(reader)
+        # В тестах нет отдельной реплики: её роль играет основная БД.
+        with self.settings(REPLICA_DATABASES=['default']):
+            response = client.get(
+                reverse('posts:profile_follow', args=(self.author.username,))
+            )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        profile = RequestFactory().get(response.url)
+        profile.COOKIES[settings.REPLICA_PIN_COOKIE] = (
+            response.cookies[settings.REPLICA_PIN_COOKIE].value
+        )
+        self.assertEqual(self.route(profile), 'default')
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class StaleReplicaCacheTests(TransactionTestCase):
+    """Отдельная реплика, которая обновляется только через sync()."""
+
+    def setUp(self):
+        cache.clear()
+        handle, self.replica_name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases['replica'] = {
+            **connections.databases[DEFAULT_DB_ALIAS],
+            'NAME': self.replica_name,
+        }
+        self.author = User.objects.create_user(username='StaleAuthor')
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.sync()
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections.databases['replica']
+        if hasattr(connections._connections, 'replica'):
+            delattr(connections._connections, 'replica')
+        os.remove(self.replica_name)
+
+    def sync(self):
+        connections['replica'].close()
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(self.replica_name)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    def test_cache_miss_is_not_built_from_stale_replica(self):
+        """Страница и фрагменты не кэшируются по отставшей реплике"""
+        url = reverse('posts:index')
+        guest = Client()
+        reader = Client()
+        reader.force_login(
+            User.objects.create_user(username='StaleReader')
+        )
+        self.assertContains(guest.get(url), 'Старый пост')
+        Post.objects.create(author=self.author, text='Свежий пост')
+        # Пользователь без cookie читает отставшую реплику, но фрагмент
+        # ленты по ней не сохраняется.
+        self.assertNotContains(reader.get(url), 'Свежий пост')
+        # Анонимный промах строится по основной БД и заполняет кэш.
+        self.assertContains(guest.get(url), 'Свежий пост')
+        self.assertContains(reader.get(url), 'Свежий пост')
+        self.sync()
+        with self.assertNumQueries(0):
+            self.assertContains(guest.get(url), 'Свежий пост')
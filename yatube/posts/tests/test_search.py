@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='SearchAuthor')
+        cls.admin = User.objects.create_superuser(
+            username='SearchAdmin', email='admin@example.com',
+            password='password',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Рецепт борща со сметаной'
+        )
+        cls.other = Post.objects.create(
+            author=cls.author, text='Заметки о погоде'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query, **params):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_search_follows_saves_and_deletes(self):
+        """Индекс обновляется при создании, правке и удалении"""
+        self.assertEqual(list(self.found('борщ')), [self.post])
+        self.post.text = 'Рецепт солянки'
+        self.post.save()
+        self.assertEqual(list(self.found('борщ')), [])
+        self.assertEqual(list(self.found('солянк')), [self.post])
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Солянка сборная')
+        ])
+        self.assertEqual(len(self.found('солянк')), 2)
+        self.post.delete()
+        self.assertEqual(len(self.found('солянк')), 1)
+
+    def test_comment_match_ranks_below_post_match(self):
+        """Комментарий находит пост, но ниже совпадения в самом посте"""
+        comment = Comment.objects.create(
+            post=self.other, author=self.author, text='Лучше бы борщ'
+        )
+        self.assertEqual(list(self.found('борщ')), [self.post, self.other])
+        comment.delete()
+        self.assertEqual(list(self.found('борщ')), [self.post])
+
+    @override_settings(SORTING_VALUE=2)
+    def test_cursor_pagination(self):
+        """Курсор продолжает выдачу без повторов"""
+        Post.objects.bulk_create([
+            Post(author=self.author, text=f'Погода на день {i}')
+            for i in range(3)
+        ])
+        first = self.found('погод')
+        self.assertTrue(first.has_next())
+        second = self.found(
+            'погод', cursor=first.paginator.next_cursor
+        )
+        self.assertFalse(second.has_next())
+        seen = [post.pk for post in first] + [post.pk for post in second]
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(len(set(seen)), 4)
+
+    def test_query_syntax_is_escaped(self):
+        """Кавычки и операторы FTS5 в запросе не ломают поиск"""
+        for query in ('"борщ', 'борщ OR', 'NEAR(', '***'):
+            with self.subTest(query=query):
+                self.found(query)
+
+    def test_admin_search_and_rebuild(self):
+        """Поиск в админке и команда rebuild_search"""
+        client = Client()
+        client.force_login(self.admin)
+        call_command('rebuild_search')
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'сметан'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
@@ -0,0 +1,59 @@
+import io
+import statistics
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class SeedBenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_load', users=30, groups=4, posts=300, comments=600,
+            follows=80, stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+
+    def test_seeded_data_is_skewed(self):
+        """Посты, комментарии и подписки сосредоточены у немногих"""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 4)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 600)
+        self.assertEqual(Follow.objects.count(), 80)
+        for field in ('post_count', 'follower_count'):
+            with self.subTest(field=field):
+                counts = list(UserStats.objects.values_list(field, flat=True))
+                self.assertGreater(max(counts), 3 * statistics.median(counts))
+        hottest = Post.objects.order_by('-comment_count').first()
+        self.assertGreater(hottest.comment_count, 600 / 300 * 10)
+        sizes = Group.objects.annotate(total=Count('posts')).values_list(
+            'total', flat=True
+        ).order_by('-total')
+        self.assertGreater(sizes[0], 2 * sizes[3])
+
+    def test_benchmark_reports_and_compares(self):
+        """Замер покрывает страницы posts, рост запросов - регрессия"""
+        current = benchmark.run(repeat=1)
+        for name in ('post_detail', 'follow_index', 'post_edit',
+                     'trending', 'group_index'):
+            self.assertIn(name, current['results'])
+        for name, result in current['results'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['status'], 200)
+                self.assertGreater(result['queries'], 0)
+        lines, regressions = benchmark.compare(current, current)
+        self.assertEqual(regressions, [])
+        baseline = {
+            'dataset': current['dataset'],
+            'results': {
+                name: {**result, 'queries': result['queries'] - 1}
+                for name, result in current['results'].items()
+            },
+        }
+        lines, regressions = benchmark.compare(current, baseline)
+        self.assertEqual(regressions, list(current['results']))
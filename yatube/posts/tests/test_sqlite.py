@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+class SqlitePragmaTests(SimpleTestCase):
+    def test_new_connection_is_tuned(self):
+        """Новое соединение получает WAL и остальные PRAGMA"""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper({
+                **connection.settings_dict,
+                'NAME': os.path.join(directory, 'tuned.sqlite3'),
+            }, alias='tuned')
+            wrapper.ensure_connection()
+            try:
+                raw = wrapper.connection
+                values = {
+                    name: raw.execute(f'PRAGMA {name}').fetchone()[0]
+                    for name in ('journal_mode', 'synchronous',
+                                 'busy_timeout', 'cache_size', 'temp_store')
+                }
+            finally:
+                wrapper.close()
+        self.assertEqual(values, {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'cache_size': -20000,
+            'temp_store': 2,
+        })
@@ -0,0 +1,51 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+
+User = get_user_model()
+
+METRIC = re.compile(r'([\w.-]+);dur=([\d.]+)(?:;desc="([^"]*)")?')
+
+
+@override_settings(SERVER_TIMING=True)
+class TemplateTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TimingAuthor')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def metrics(self, url):
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {
+            name: (float(duration), description)
+            for name, duration, description
+            in METRIC.findall(response['Server-Timing'])
+        }
+
+    def test_templates_in_server_timing(self):
+        """Server-Timing содержит время каждого шаблона и include"""
+        metrics = self.metrics(reverse('posts:index'))
+        self.assertIn('db', metrics)
+        self.assertEqual(metrics['tpl-posts-index.html'][1],
+                         'posts/index.html x1')
+        self.assertEqual(metrics['tpl-includes-article.html'][1],
+                         'includes/article.html x3')
+        own = sum(
+            duration for name, (duration, _) in metrics.items()
+            if name.startswith('tpl-')
+        )
+        self.assertLessEqual(own, metrics['tpl'][0] + 0.5)
@@ -0,0 +1,165 @@
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+from ..thumbnails import THUMBNAIL_GEOMETRIES, generate, prefetch
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='ThumbAuthor')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.small_gif = small_gif
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=small_gif,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Записи KV-хранилища откатываются вместе с тестом, кэш - нет.
+        cache.clear()
+        # Внутри TestCase on_commit не срабатывает: выполняем сразу,
+        # как вне транзакции, а пул заменяем подделкой.
+        patches = (
+            mock.patch.object(thumbnails.transaction, 'on_commit',
+                              side_effect=lambda func: func()),
+            mock.patch.object(thumbnails, '_executor', None),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def assertThumbnailsExist(self):
+        for geometry, options in THUMBNAIL_GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                thumbnail = default.backend.get_thumbnail(
+                    self.post.image, geometry, **options
+                )
+                self.assertTrue(os.path.exists(
+                    os.path.join(TEMP_MEDIA_ROOT, thumbnail.name)
+                ))
+
+    def test_generate_builds_every_template_geometry(self):
+        """generate строит миниатюры всех размеров из шаблонов"""
+        generate(self.post.image.name)
+        self.assertThumbnailsExist()
+
+    def test_prefetch_reads_whole_page_at_once(self):
+        """prefetch находит миниатюры страницы одним запросом"""
+        generate(self.post.image.name)
+        geometry, options = THUMBNAIL_GEOMETRIES[0]
+        expected = default.backend.get_thumbnail(
+            self.post.image, geometry, **options
+        )
+        text_post = Post.objects.create(author=self.user, text='Без картинки')
+        cache.clear()
+        posts = list(Post.objects.filter(pk__in=(self.post.pk, text_post.pk)))
+        with self.assertNumQueries(1):
+            prefetch(posts)
+        with self.assertNumQueries(0):
+            prefetch(posts)
+        thumbnails = {post.pk: post.thumbnail for post in posts}
+        self.assertEqual(thumbnails[self.post.pk].url, expected.url)
+        self.assertIsNone(thumbnails[text_post.pk])
+
+    def test_schedule_submits_after_commit(self):
+        """schedule отправляет картинку в пул, если генерация включена"""
+        pool = mock.Mock()
+        with mock.patch.object(thumbnails, 'worker_pool', return_value=pool):
+            with self.settings(THUMBNAIL_PREGENERATE=False):
+                thumbnails.schedule(self.post.image)
+            pool.submit.assert_not_called()
+            thumbnails.schedule(self.post.image)
+        pool.submit.assert_called_once_with(generate, self.post.image.name)
+
+    def test_broken_pool_does_not_fail_request(self):
+        """Сломанный пул не ломает создание поста и пересоздаётся"""
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool('рабочий процесс умер')
+        healthy = mock.Mock()
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch.object(thumbnails, 'worker_pool',
+                               side_effect=[broken, healthy]):
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                response = client.post(reverse('posts:post_create'), {
+                    'text': 'Ещё пост',
+                    'image': SimpleUploadedFile(
+                        'other.gif', self.small_gif, 'image/gif'
+                    ),
+                })
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(Post.objects.filter(text='Ещё пост').exists())
+            broken.shutdown.assert_called_once_with(wait=False)
+            thumbnails.schedule(self.post.image)
+        healthy.submit.assert_called_once()
+
+    def test_warm_thumbnails_command(self):
+        """warm_thumbnails строит миниатюры всех картинок постов"""
+        pool = mock.MagicMock()
+        # Рабочие процессы не видят тестовую БД в памяти, поэтому
+        # задания выполняются в этом же процессе.
+        pool.__enter__.return_value.map.side_effect = (
+            lambda func, items, chunksize: map(func, items)
+        )
+        out = io.StringIO()
+        with mock.patch.object(thumbnails, 'worker_pool', return_value=pool):
+            call_command('warm_thumbnails', stdout=out)
+        self.assertIn('Готово: 1 картинок, ошибок 0', out.getvalue())
+        self.assertThumbnailsExist()
+
+    def test_warm_thumbnails_reports_failures(self):
+        """Ошибки прогрева пишутся в журнал и попадают в итог команды"""
+        pool = mock.MagicMock()
+        pool.__enter__.return_value.map.side_effect = (
+            lambda func, items, chunksize: map(func, items)
+        )
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch.object(thumbnails, 'worker_pool', return_value=pool):
+            with mock.patch.object(thumbnails, 'generate',
+                                   side_effect=OSError('битый файл')):
+                with self.assertLogs('posts.management.commands',
+                                     'ERROR') as logs:
+                    call_command('warm_thumbnails', stdout=out, stderr=err)
+        self.assertIn(self.post.image.name, logs.output[0])
+        self.assertIn('битый файл', logs.output[0])
+        self.assertIn('Готово: 1 картинок, ошибок 1', out.getvalue())
+        self.assertIn('Не удалось обработать картинок: 1', err.getvalue())
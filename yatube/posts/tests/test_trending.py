@@ -0,0 +1,115 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Post, TrendingEpoch
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TrendAuthor')
+        cls.quiet, cls.hot, cls.viewed = (
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def comment(self, post, count=1):
+        for number in range(count):
+            Comment.objects.create(
+                post=post, author=self.author, text=f'Комментарий {number}'
+            )
+
+    def scores(self):
+        return dict(Post.objects.values_list('pk', 'trend_score'))
+
+    def test_comments_rank_posts(self):
+        """Пост с большим числом свежих комментариев выше в популярном"""
+        self.comment(self.quiet)
+        self.comment(self.hot, 3)
+        response = self.guest_client.get(reverse('posts:trending'))
+        self.assertEqual(
+            response.context['page_obj'], [self.hot, self.quiet]
+        )
+        self.hot.text = 'Правка'
+        self.hot.save()
+        self.assertAlmostEqual(
+            Post.objects.get(pk=self.hot.pk).trend_score, 3, places=3
+        )
+
+    def test_compaction_counts_views_and_decays(self):
+        """Сжатие учитывает просмотры, сдвигает epoch и сохраняет порядок"""
+        self.comment(self.hot, 2)
+        self.comment(self.quiet)
+        for _ in range(5):
+            self.guest_client.get(
+                reverse('posts:post_detail', args=(self.viewed.pk,))
+            )
+        half_life_ago = timezone.now() - timedelta(hours=6)
+        TrendingEpoch.objects.update(started=half_life_ago)
+        call_command('compact_trending', stdout=StringIO())
+        scores = self.scores()
+        # Оценки затухли за период полураспада, просмотры добавлены
+        # с весом текущего момента.
+        self.assertAlmostEqual(scores[self.hot.pk], 1.0, places=2)
+        self.assertAlmostEqual(scores[self.quiet.pk], 0.5, places=2)
+        self.assertAlmostEqual(scores[self.viewed.pk], 0.5, places=2)
+        self.assertGreater(
+            TrendingEpoch.objects.get().started, half_life_ago
+        )
+        self.assertEqual(trending.compact(), 0)
+
+    def test_old_posts_views_not_counted(self):
+        """Просмотры постов вне окна не копятся в кэше"""
+        Post.objects.filter(pk=self.quiet.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        for post in (self.quiet, self.viewed):
+            self.guest_client.get(
+                reverse('posts:post_detail', args=(post.pk,))
+            )
+        self.assertIsNone(cache.get(trending._view_key(self.quiet.pk)))
+        self.assertEqual(cache.get(trending._view_key(self.viewed.pk)), 1)
+
+    def test_rebuild_from_comments(self):
+        """Пересчёт по комментариям учитывает их возраст"""
+        self.comment(self.hot)
+        self.comment(self.quiet)
+        Comment.objects.filter(post=self.quiet).update(
+            created=timezone.now() - timedelta(hours=12)
+        )
+        trending.rebuild()
+        scores = self.scores()
+        self.assertAlmostEqual(scores[self.hot.pk], 1.0, places=2)
+        self.assertAlmostEqual(scores[self.quiet.pk], 0.25, places=2)
+        self.assertEqual(scores[self.viewed.pk], 0)
+
+    def test_rebuild_writes_in_batches(self):
+        """Пересчёт пишет оценки пачками по REBUILD_BATCH_SIZE"""
+        for post in (self.quiet, self.hot, self.viewed):
+            self.comment(post)
+        with mock.patch.object(trending, 'REBUILD_BATCH_SIZE', 2):
+            with mock.patch.object(Post.objects, 'bulk_update',
+                                   wraps=Post.objects.bulk_update) as update:
+                trending.rebuild()
+        self.assertEqual(
+            [len(call.args[0]) for call in update.call_args_list], [2, 1]
+        )
+        self.assertEqual(
+            Post.objects.filter(trend_score__gt=0).count(), 3
+        )
@@ -9,8 +9,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from .. import thumbnails
 from ..forms import PostForm
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -57,6 +58,8 @@ class ViewTests(TestCase):
             group=cls.group,
             image=cls.uploaded
         )
+        # Пул строит миниатюры после коммита, которого в TestCase нет.
+        thumbnails.generate(cls.post.image.name)
 
     @classmethod
     def tearDownClass(cls):
@@ -114,6 +117,30 @@ class ViewTests(TestCase):
         )
         self.assertEqual(response.context.get('post'), self.post)
 
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_comments_paginated(self):
+        """Комментарии выводятся порциями, следующая - фрагментом"""
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.follower, text=f'Ком {i}'
+            )
+            for i in range(3)
+        ]
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args={self.post.id})
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), comments[:0:-1])
+        self.assertTrue(page.has_next())
+        fragment = self.guest_client.get(
+            reverse('posts:post_comments', args={self.post.id}),
+            {'cursor': page.paginator.next_cursor},
+        )
+        self.assertEqual(list(fragment.context['comments']), comments[:1])
+        self.assertContains(fragment, 'Ком 0')
+        self.assertNotContains(fragment, 'Ком 2')
+        self.assertNotContains(fragment, '<html')
+
     def test_context_for_post_create(self):
         """Проверка контекста на странице create"""
 
@@ -131,13 +158,30 @@ class ViewTests(TestCase):
     def test_cache(self):
         """Тест кэша страницы index"""
         response_1 = self.guest_client.get(reverse("posts:index"))
-        Post.objects.get(pk=self.post.pk).delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
         response_2 = self.guest_client.get(reverse("posts:index"))
         self.assertEqual(response_1.content, response_2.content)
         cache.clear()
         response_3 = self.guest_client.get(reverse("posts:index"))
         self.assertNotEqual(response_2.content, response_3.content)
 
+    def test_cache_invalidated_on_write(self):
+        """Кэш лент сбрасывается сразу после изменения поста"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        before = [self.guest_client.get(url).content for url in urls]
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        for url, content in zip(urls, before):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotEqual(response.content, content)
+                self.assertContains(response, 'Отредактированный пост')
+
     def test_new_posts_for_subscribers(self):
         """Тест появления новых постов у подписчиков"""
         self.authorized_client.get(reverse(
@@ -0,0 +1,155 @@
+"""
+Предварительная генерация миниатюр sorl.thumbnail вне запроса.
+
+Шаблоны лент и страницы поста вызывают `{% thumbnail %}` с геометриями
+из THUMBNAIL_GEOMETRIES; если миниатюры нет, sorl строит её прямо во
+время рендера. Поэтому после загрузки картинки все нужные размеры
+строятся в отдельном процессе, а команда `warm_thumbnails` делает то же
+для уже загруженных изображений.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Должно совпадать с тегами {% thumbnail %} в шаблонах.
+THUMBNAIL_GEOMETRIES = (
+    ("960x339", {"crop": "center", "upscale": True}),
+)
+
+_executor = None
+
+
+# Настройки, которые рабочий процесс берёт у запустившего его процесса,
+# а не из модуля settings: так он видит те же БД, кэш и MEDIA_ROOT.
+INHERITED_SETTINGS = ("DATABASES", "CACHES", "MEDIA_ROOT")
+
+
+def _init_worker(inherited):
+    import django
+    from django.conf import settings
+
+    for name, value in inherited.items():
+        setattr(settings, name, value)
+    django.setup()
+
+
+def worker_pool(max_workers=None):
+    inherited = {name: getattr(settings, name) for name in INHERITED_SETTINGS}
+    return ProcessPoolExecutor(
+        max_workers=max_workers or settings.THUMBNAIL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(inherited,),
+    )
+
+
+def generate(name):
+    """Строит все миниатюры для файла из Post.image, возвращает имя."""
+    from sorl.thumbnail import get_thumbnail
+
+    from .models import Post
+
+    field = Post._meta.get_field("image")
+    source = field.attr_class(None, field, name)
+    for geometry, options in THUMBNAIL_GEOMETRIES:
+        get_thumbnail(source, geometry, **options)
+    return name
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error("Не удалось построить миниатюры: %s", error)
+
+
+def _submit(name):
+    """
+    Отправляет картинку в пул; ошибки пула не доходят до представления.
+
+    Вне транзакции on_commit вызывает функцию сразу, и исключение
+    (например, BrokenProcessPool после гибели рабочего процесса) дошло
+    бы до уже сохранившего пост представления. Вместо этого сломанный
+    пул сбрасывается, а миниатюру построит тег `{% thumbnail %}`.
+    """
+    global _executor
+    try:
+        if _executor is None:
+            _executor = worker_pool()
+        future = _executor.submit(generate, name)
+    except Exception:
+        logger.exception(
+            "Пул миниатюр недоступен, %s будет обработан при показе", name
+        )
+        broken, _executor = _executor, None
+        if broken is not None:
+            broken.shutdown(wait=False)
+        return
+    future.add_done_callback(_log_failure)
+
+
+def schedule(image):
+    """Ставит генерацию миниатюр в очередь после коммита транзакции."""
+    if image and settings.THUMBNAIL_PREGENERATE:
+        name = image.name
+        transaction.on_commit(lambda: _submit(name))
+
+
+def _thumbnail_file(source, geometry, options):
+    """
+    ImageFile миниатюры без обращения к хранилищам.
+
+    Повторяет подготовку опций из ThumbnailBackend.get_thumbnail, чтобы
+    ключ совпал с тем, что ищет и записывает тег `{% thumbnail %}`.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.conf import defaults
+    from sorl.thumbnail.conf import settings as sorl_settings
+    from sorl.thumbnail.images import ImageFile
+
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def prefetch(posts):
+    """
+    Проставляет постам страницы `thumbnail` одним чтением KV-хранилища.
+
+    Шаблон берёт готовый `post.thumbnail.url`, и цикл по постам не ходит
+    ни в кэш, ни в файловую систему. Если миниатюры ещё нет, атрибут
+    равен None и шаблон строит её обычным тегом `{% thumbnail %}`.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.images import ImageFile
+
+    geometry, options = THUMBNAIL_GEOMETRIES[0]
+    wanted = {}
+    for post in posts:
+        post.thumbnail = None
+        if post.image:
+            thumbnail = _thumbnail_file(
+                ImageFile(post.image), geometry, options
+            )
+            wanted.setdefault(thumbnail.key, (thumbnail, []))[1].append(post)
+    if not wanted:
+        return
+    found = default.kvstore.get_many(
+        thumbnail for thumbnail, _ in wanted.values()
+    )
+    for key, thumbnail in found.items():
+        for post in wanted[key][1]:
+            post.thumbnail = thumbnail
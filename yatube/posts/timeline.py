@@ -0,0 +1,105 @@
+"""
+Материализованная лента подписок (fan-out on write).
+
+При публикации поста его id раскладывается по лентам всех подписчиков
+автора, поэтому `follow_index` читает один диапазон индекса
+(user_id, pub_date) вместо соединения posts_follow со всей posts_post.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import FeedEntry, Follow, Post
+
+BATCH_SIZE = 1000
+
+
+def _follower_ids(author_id):
+    # Список, а не iterator(): открытый курсор держит снимок БД, и в
+    # режиме WAL журнал не может обнулиться, пока идут вставки.
+    return list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list("user_id", flat=True))
+
+
+def _bulk_insert(entries):
+    # Размер пачки INSERT выбирает Django: на SQLite он ограничен числом
+    # частей составного SELECT, а явный batch_size это ограничение обходит.
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    batch = []
+    for user_id in _follower_ids(post.author_id):
+        batch.append(
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        )
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    if batch:
+        _bulk_insert(batch)
+
+
+def fan_out_since(author_id, since):
+    """Раскладывает посты автора новее `since` (после bulk_create)."""
+    posts = list(Post.objects.filter(
+        author_id=author_id, pub_date__gte=since
+    ).values_list("pk", "pub_date"))
+    for user_id in _follower_ids(author_id):
+        _bulk_insert([
+            FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ])
+
+
+def backfill(user_id, author_id):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", "pub_date"
+    )[:settings.TIMELINE_BACKFILL]
+    _bulk_insert([
+        FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    ])
+
+
+def trim(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты по текущим подпискам, возвращает число лент."""
+    follows = Follow.objects.order_by("user_id")
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+    rebuilt, last_user_id = 0, 0
+    while True:
+        # Подписки читаются пачками пользователей целиком, без открытого
+        # курсора во время записи (см. _follower_ids).
+        batch = list(follows.filter(user_id__gt=last_user_id).values_list(
+            "user_id", flat=True
+        ).distinct()[:BATCH_SIZE])
+        if not batch:
+            break
+        last_user_id = batch[-1]
+        rows = follows.filter(user_id__in=batch).order_by(
+            "user_id"
+        ).values_list("user_id", "author_id")
+        # Одна транзакция на ленту: на SQLite каждая фиксация - это fsync.
+        for user_id, authors in groupby(list(rows), key=itemgetter(0)):
+            with transaction.atomic():
+                FeedEntry.objects.filter(user_id=user_id).delete()
+                for _, author_id in authors:
+                    backfill(user_id, author_id)
+            rebuilt += 1
+    stale = FeedEntry.objects.exclude(
+        user_id__in=Follow.objects.values("user_id")
+    )
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    stale.delete()
+    return rebuilt
@@ -0,0 +1,149 @@
+"""
+Популярные посты: затухающая сумма комментариев и просмотров.
+
+Вклад события в момент t равен weight * exp((t - epoch) / TAU), где
+epoch хранится в TrendingEpoch. У всех постов оценки приведены к одному
+epoch, поэтому порядок по trend_score совпадает с порядком по оценке,
+затухшей к текущему моменту, и страница читает первые N строк индекса
+post_trend. Комментарий прибавляет свой вклад сразу атомарным UPDATE.
+Просмотры копятся в кэше, и периодическая команда compact_trending
+(раз в TRENDING_COMPACT_INTERVAL секунд из cron) переносит их в
+оценки; просмотры постов старше TRENDING_VIEW_WINDOW не считаются, а
+счётчики живут два интервала, так что пропущенный запуск не теряет
+просмотры, а брошенные счётчики не копятся в кэше. Затем она умножает
+все оценки на exp(-(now - epoch) / TAU) и сдвигает epoch к now, чтобы
+вклады не росли до переполнения.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import cache_counters
+
+from .models import Comment, Post, TrendingEpoch
+
+COMMENT_WEIGHT = 1.0
+VIEW_WEIGHT = 0.1
+# Оценки меньше этой обнуляются при сжатии, чтобы индекс не держал
+# давно остывшие посты.
+MIN_SCORE = 0.01
+# Сколько строк писать одним bulk_update при пересчёте.
+REBUILD_BATCH_SIZE = 500
+
+
+def _tau():
+    return settings.TRENDING_HALF_LIFE / math.log(2)
+
+
+def _epoch():
+    epoch = TrendingEpoch.objects.order_by("pk").first()
+    if epoch is None:
+        epoch = TrendingEpoch.objects.create(started=timezone.now())
+    return epoch
+
+
+def _weight(epoch, moment):
+    return math.exp((moment - epoch.started).total_seconds() / _tau())
+
+
+def comment_added(comment):
+    with transaction.atomic():
+        delta = COMMENT_WEIGHT * _weight(_epoch(), comment.created)
+        Post.objects.filter(pk=comment.post_id).update(
+            trend_score=F("trend_score") + delta
+        )
+
+
+def _view_key(post_id):
+    return f"trending:views:{post_id}"
+
+
+def _view_window_start(now):
+    return now - timedelta(seconds=settings.TRENDING_VIEW_WINDOW)
+
+
+def viewed(post):
+    if post.pub_date < _view_window_start(timezone.now()):
+        # Сжатие такие просмотры не переносит.
+        return
+    cache_counters.incr(
+        _view_key(post.pk), timeout=2 * settings.TRENDING_COMPACT_INTERVAL
+    )
+
+
+def _flush_views(epoch, now):
+    """Переносит просмотры из кэша в оценки, возвращает их число."""
+    recent = Post.objects.filter(
+        pub_date__gte=_view_window_start(now)
+    ).values_list("pk", flat=True)
+    keys = [_view_key(pk) for pk in recent]
+    views = cache.get_many(keys)
+    cache.delete_many(views)
+    by_count = defaultdict(list)
+    for key, count in views.items():
+        by_count[count].append(int(key.rsplit(":", 1)[1]))
+    weight = VIEW_WEIGHT * _weight(epoch, now)
+    for count, post_ids in by_count.items():
+        Post.objects.filter(pk__in=post_ids).update(
+            trend_score=F("trend_score") + count * weight
+        )
+    return sum(views.values())
+
+
+def compact():
+    """Сжатие: просмотры в оценки, затухание и новый epoch."""
+    now = timezone.now()
+    with transaction.atomic():
+        epoch = _epoch()
+        views = _flush_views(epoch, now)
+        factor = 1 / _weight(epoch, now)
+        Post.objects.filter(trend_score__gt=0).update(
+            trend_score=F("trend_score") * factor
+        )
+        Post.objects.filter(
+            trend_score__gt=0, trend_score__lt=MIN_SCORE
+        ).update(trend_score=0)
+        epoch.started = now
+        epoch.save(update_fields=["started"])
+    return views
+
+
+def rebuild():
+    """Пересчитывает оценки по комментариям (после загрузки данных)."""
+    now = timezone.now()
+    # Вклад комментариев старше 20 периодов полураспада меньше 1e-6.
+    since = now - timedelta(seconds=20 * settings.TRENDING_HALF_LIFE)
+    with transaction.atomic():
+        epoch = _epoch()
+        epoch.started = now
+        epoch.save(update_fields=["started"])
+        scores = defaultdict(float)
+        rows = Comment.objects.filter(created__gte=since).values_list(
+            "post_id", "created"
+        )
+        # Комментарии читаются потоком, в памяти только оценки постов.
+        # Запись начинается после того, как курсор дочитан.
+        for post_id, created in rows.iterator():
+            scores[post_id] += COMMENT_WEIGHT * _weight(epoch, created)
+        Post.objects.filter(trend_score__gt=0).update(trend_score=0)
+        hot = [(pk, score) for pk, score in scores.items()
+               if score >= MIN_SCORE]
+        for start in range(0, len(hot), REBUILD_BATCH_SIZE):
+            Post.objects.bulk_update(
+                [Post(pk=pk, trend_score=score)
+                 for pk, score in hot[start:start + REBUILD_BATCH_SIZE]],
+                ["trend_score"],
+            )
+
+
+def ranked():
+    """Посты с ненулевой оценкой по убыванию, по индексу post_trend."""
+    return Post.objects.filter(trend_score__gt=0).order_by(
+        "-trend_score", "-pk"
+    )
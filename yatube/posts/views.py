@@ -2,62 +2,142 @@ import logging
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.db.models import Prefetch
+from django.db.models import F
 
+from core.ratelimit import rate_limit
+
+from . import (feed_cache, followed, live, recommend, thumbnails,
+               trending)
+from .decorators import anonymous_page_cache, choice, page_number
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User, Comment
+from .models import Follow, Group, GroupStats, Post, User, user_stats
+from .paginators import (CountCachePaginator, CursorPaginator,
+                         SearchPaginator)
 
 logger = logging.getLogger(__name__)
 
 
-def page_paginator(post_list, page_number):
-    paginator = Paginator(post_list, settings.SORTING_VALUE)
-    return paginator.get_page(page_number)
+def page_paginator(request, post_list, count_key=None, count=None,
+                   **ordering):
+    page_number = request.GET.get("page")
+    if page_number is None and settings.PAGINATION_MODE == "cursor":
+        paginator = CursorPaginator(
+            post_list, settings.SORTING_VALUE, **ordering
+        )
+        page_obj = paginator.get_cursor_page(request.GET.get("cursor"))
+    else:
+        paginator = CountCachePaginator(
+            post_list, settings.SORTING_VALUE,
+            count_key=count_key, count=count,
+        )
+        page_obj = paginator.get_page(page_number)
+    thumbnails.prefetch(page_obj)
+    return page_obj
 
 
+@anonymous_page_cache(feed_cache.GLOBAL)
 def index(request):
+    live_version = live.start(request, live.INDEX)
     post_list = Post.objects.select_related("author", "group")
-    page_number = request.GET.get("page")
+    page_obj = page_paginator(
+        request, post_list, count_key="feed-count:global"
+    )
     context = {
         "title": "Последнее обновление на сайте",
-        "page_obj": page_paginator(post_list, page_number),
+        "page_obj": page_obj,
+        "feed_cache": feed_cache.fragment(feed_cache.GLOBAL),
+        "live": live.state(live.INDEX, page_obj, live_version),
     }
     return render(request, "posts/index.html", context)
 
 
+def trending_posts(request):
+    posts = list(trending.ranked().select_related("author", "group")[
+        :settings.TRENDING_SIZE
+    ])
+    thumbnails.prefetch(posts)
+    context = {
+        "title": "Популярное",
+        "page_obj": posts,
+        "trending": True,
+    }
+    return render(request, "posts/trending.html", context)
+
+
+# Сортировки каталога групп; первые две идут по индексам GroupStats.
+GROUP_ORDERINGS = {
+    "activity": ("-last_post_date", "-group"),
+    "posts": ("-post_count", "-group"),
+    "title": ("group__title", "group"),
+}
+
+
+@anonymous_page_cache(feed_cache.GROUPS, params={
+    "page": page_number, "sort": choice(GROUP_ORDERINGS),
+})
+def group_index(request):
+    sort = request.GET.get("sort")
+    if sort not in GROUP_ORDERINGS:
+        sort = "activity"
+    stats = GroupStats.objects.select_related("group").order_by(
+        *GROUP_ORDERINGS[sort]
+    )
+    paginator = CountCachePaginator(
+        stats, settings.GROUPS_PER_PAGE, count_key="feed-count:groups"
+    )
+    context = {
+        "title": "Группы",
+        "page_obj": paginator.get_page(request.GET.get("page")),
+        "sort": sort,
+        "page_params": f"sort={sort}&",
+        "feed_cache": feed_cache.fragment(feed_cache.GROUPS),
+    }
+    return render(request, "posts/group_index.html", context)
+
+
+@anonymous_page_cache(feed_cache.GROUP, "slug")
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related("author")
-    page_number = request.GET.get("page")
     context = {
         "group": group,
-        "page_obj": page_paginator(post_list, page_number),
+        "page_obj": page_paginator(
+            request, post_list, count_key=f"feed-count:group:{group.pk}"
+        ),
+        "feed_cache": feed_cache.fragment(feed_cache.GROUP, group.pk),
     }
 
     return render(request, "posts/group_list.html", context)
 
 
+@anonymous_page_cache(feed_cache.AUTHOR, "username")
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
     post_list = author.posts.select_related("group")
-    page_number = request.GET.get("page")
-    page_obj = page_paginator(post_list, page_number)
-    following = (request.user.is_authenticated
-                 and author.following.filter(user=request.user).exists())
+    stats = user_stats(author)
+    page_obj = page_paginator(request, post_list, count=stats.post_count)
+    following = author.pk in followed.for_request(request)
     context = {
         "author": author,
         "title": f"Профайл пользователя {username}",
         "page_obj": page_obj,
-        "post_count": page_obj.paginator.count,
+        "post_count": stats.post_count,
+        "stats": stats,
         "following": following,
+        "feed_cache": feed_cache.fragment(feed_cache.AUTHOR, author.pk),
+        "recommendations": recommend.for_request(
+            request, exclude={author.pk}
+        ),
     }
 
     return render(request, "posts/profile.html", context)
 
 
 @login_required
+@rate_limit("add_comment", methods=("POST",))
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -69,30 +149,45 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def comment_page(request, post):
+    """Страница комментариев поста по курсору на (created, id)."""
+    paginator = CursorPaginator(
+        post.comments.select_related("author"),
+        settings.COMMENTS_PER_PAGE, key="created",
+    )
+    return paginator.get_cursor_page(request.GET.get("cursor"))
+
+
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related("author", "group").prefetch_related(
-            Prefetch("comments",
-                     queryset=Comment.objects.select_related("author"))
-        ),
-        pk=post_id
+        Post.objects.select_related("author__stats", "group"), pk=post_id
     )
-    post_count = post.author.posts.count()
+    trending.viewed(post)
     context = {
         "post": post,
-        "post_count": post_count,
+        "post_count": user_stats(post.author).post_count,
         "form": CommentForm(),
+        "comments": comment_page(request, post),
     }
     return render(request, "posts/post_detail.html", context)
 
 
+def post_comments(request, post_id):
+    # Следующая порция комментариев HTML-фрагментом для post_detail.
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    context = {"post": post, "comments": comment_page(request, post)}
+    return render(request, "includes/comment_list.html", context)
+
+
 @login_required
+@rate_limit("post_create", methods=("POST",))
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post.image)
         return redirect("posts:profile", username=request.user.username)
     context = {"form": form, "title": "Создание"}
     return render(
@@ -113,6 +208,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if "image" in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect("posts:post_detail", post_id=post.pk)
     context = {"form": form, "is_edit": True}
     return render(
@@ -122,28 +219,61 @@ def post_edit(request, post_id):
     )
 
 
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page_obj = None
+    if query:
+        paginator = SearchPaginator(
+            Post.objects.select_related("author", "group"),
+            settings.SORTING_VALUE, query,
+        )
+        page_obj = paginator.get_cursor_page(request.GET.get("cursor"))
+        thumbnails.prefetch(page_obj)
+    context = {
+        "title": "Поиск",
+        "query": query,
+        "page_obj": page_obj,
+    }
+    return render(request, "posts/search.html", context)
+
+
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_number = request.GET.get("page")
-    context = {'page_obj': page_paginator(post_list, page_number)}
+    live_version = live.start(request, live.FOLLOW)
+    # Сортировка по колонкам самой ленты, чтобы хватило индекса
+    # feed_entry_user_date без сортировки результата.
+    post_list = Post.objects.filter(
+        feed_entries__user=request.user
+    ).annotate(
+        feed_date=F("feed_entries__pub_date"),
+        feed_post=F("feed_entries__post"),
+    ).select_related("author", "group").order_by("-feed_date", "-feed_post")
+    page_obj = page_paginator(
+        request, post_list,
+        count_key=f"feed-count:follow:{request.user.pk}",
+        key="feed_date", tiebreak="feed_post",
+    )
+    context = {
+        'page_obj': page_obj,
+        'live': live.state(live.FOLLOW, page_obj, live_version),
+        'recommendations': recommend.for_request(request),
+    }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@rate_limit("profile_follow")
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
+    # Множество подписок из кэша может отставать, поэтому решает БД:
+    # и get_or_create, и delete безопасно повторять.
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
-        return redirect(
-            'posts:profile',
-            username=username
-        )
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
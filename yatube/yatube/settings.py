@@ -49,6 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.QueryInstrumentationMiddleware",
+    "core.middleware.TemplateTimingMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -60,18 +63,31 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "yatube.urls"
 
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+# В production шаблоны и include компилируются один раз на процесс,
+# при DEBUG - перечитываются с диска на каждый запрос.
+TEMPLATE_CACHE = not DEBUG
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "core.context_processors.year.year",
+                "core.context_processors.following.following",
             ],
         },
     },
@@ -87,8 +103,41 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Соединение живёт между запросами, PRAGMA выполняются один раз.
+        "CONN_MAX_AGE": 60,
     }
 }
+# PRAGMA для каждого нового соединения SQLite (core.sqlite).
+# busy_timeout идёт первым: переключению в WAL тоже нужна блокировка.
+SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    # Отрицательное значение - размер в КиБ.
+    "cache_size": -20000,
+    "mmap_size": 128 * 1024 * 1024,
+    "temp_store": "memory",
+    # После чекпойнта WAL-файл обрезается до этого размера.
+    "journal_size_limit": 64 * 1024 * 1024,
+}
+# Локальная проверка реплик: копия db.sqlite3, которую обновляет
+# команда sync_replica. В тестах реплика - зеркало основной БД.
+if os.environ.get("YATUBE_SQLITE_REPLICA"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "db-replica.sqlite3"),
+        "CONN_MAX_AGE": 60,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+# Алиасы реплик только для чтения (core.routers).
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != "default"]
+# Из реплик читают GET-запросы к этим пространствам имён URL.
+REPLICA_URL_NAMESPACES = ("posts", "api")
+# Сколько секунд после записи пользователь читает из основной БД.
+REPLICA_PIN_SECONDS = 15
+REPLICA_PIN_COOKIE = "pin_primary"
 
 
 # Password validation
@@ -135,6 +184,132 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Constants
 
 SORTING_VALUE = 10
+# Групп на странице каталога.
+GROUPS_PER_PAGE = 20
+# Комментарии на странице поста выводятся порциями.
+COMMENTS_PER_PAGE = 20
+# 'cursor' - постраничный вывод лент по ключу (pub_date, id),
+# 'numbered' - классический Paginator с номерами страниц.
+# Явный ?page=N включает нумерованный режим в любом случае.
+PAGINATION_MODE = 'cursor'
+# Нумерованный режим: до этого числа постов COUNT(*) считается точно,
+# выше - оценка из кэша, которую один запрос обновляет раз в
+# PAGINATOR_COUNT_TIMEOUT.
+PAGINATOR_EXACT_COUNT_LIMIT = 1000
+PAGINATOR_COUNT_TIMEOUT = 60 * 5
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL = 1000
+# Миниатюры загруженных картинок строятся в отдельных процессах.
+THUMBNAIL_PREGENERATE = True
+THUMBNAIL_WORKERS = 2
+# Загруженные картинки ужимаются до этого размера по длинной стороне
+# и перекодируются в JPEG или WEBP (если Pillow собран с его поддержкой).
+IMAGE_UPLOAD_MAX_SIDE = 1920
+IMAGE_UPLOAD_FORMAT = 'JPEG'
+IMAGE_UPLOAD_QUALITY = 85
+# KV-хранилище sorl с пакетным чтением миниатюр для страницы ленты.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+# Бэкенд полнотекстового поиска (posts.search).
+SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+# Число SQL-запросов, которое разрешено странице (по имени URL) при
+# чтении - GET и HEAD. Бюджет считается с холодным кэшем для
+# авторизованного пользователя (сессия и пользователь - два запроса) на
+# любой странице ленты, включая ?page=N и ?cursor=, и с одним чтением
+# миниатюр. Превышение пишется в лог, а в тестах (core.test_runner)
+# роняет тест.
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_index': 4,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 5,
+    'posts:post_comments': 2,
+    'posts:search': 5,
+    'posts:trending': 4,
+    'posts:follow_index': 7,
+    'posts:post_create': 3,
+    'posts:post_edit': 4,
+    'api:index': 2,
+    'api:group_list': 3,
+    'api:profile': 3,
+    'api:follow_index': 3,
+    'api:live': 3,
+    'api:post_detail': 1,
+    'api:post_comments': 2,
+    'users:signup': 2,
+    'users:login': 2,
+}
+# То же для записи (POST и другие методы): сохранение поста или
+# комментария обновляет счётчики, ленты подписчиков и поисковый индекс.
+WRITE_QUERY_BUDGETS = {
+    'posts:post_create': 12,
+    'posts:post_edit': 10,
+    'posts:add_comment': 12,
+}
+QUERY_BUDGET_RAISE = False
+# Запуск тестов с QUERY_BUDGET_RAISE = True.
+TEST_RUNNER = 'core.test_runner.BudgetTestRunner'
+# Сколько самых долгих запросов попадает в лог.
+SQL_SLOWEST_QUERIES = 3
+# Заголовок Server-Timing (число и время SQL-запросов, время шаблонов)
+# раскрывает устройство сайта, поэтому отдаётся только при отладке.
+SERVER_TIMING = DEBUG
+# Время отрисовки шаблонов в Server-Timing: общее и по самым дорогим.
+TEMPLATE_TIMING = True
+TEMPLATE_TIMING_TOP = 5
+# Логи приложений - JSON-строками в stderr: замеры запросов
+# (core.middleware) с уровня INFO, лимиты и миниатюры - с WARNING.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {'()': 'core.log_format.JsonFormatter'},
+    },
+    'handlers': {
+        'structured': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['structured'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'core.middleware': {'level': 'INFO'},
+        'posts': {
+            'handlers': ['structured'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+# Уведомления о новых постах (posts.live): через сколько секунд клиент
+# снова спрашивает версию ленты и до какого числа считать новые посты.
+LIVE_POLL_INTERVAL = 30
+LIVE_NEW_POSTS_LIMIT = 99
+# Рекомендации авторов (posts.recommend): сколько хранить на
+# пользователя и сколько показывать.
+RECOMMENDATIONS_TOP_K = 20
+RECOMMENDATIONS_SHOWN = 5
+# Популярное (posts.trending): за сколько секунд вклад комментария или
+# просмотра падает вдвое, за сколько секунд посты учитывают просмотры,
+# как часто cron запускает compact_trending и сколько постов показывать.
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_VIEW_WINDOW = 60 * 60 * 24 * 7
+TRENDING_COMPACT_INTERVAL = 60 * 60
+TRENDING_SIZE = 20
+# Лимиты записей (core.ratelimit): по имени представления - сколько
+# запросов за сколько секунд разрешено пользователю и IP-адресу.
+RATE_LIMIT_ENABLED = True
+RATE_LIMITS = {
+    'post_create': {'user': (10, 60 * 10), 'ip': (50, 60 * 10)},
+    'add_comment': {'user': (20, 60), 'ip': (100, 60)},
+    'profile_follow': {'user': (30, 60), 'ip': (150, 60)},
+}
+# Заголовок с адресом клиента; за прокси, например, 'HTTP_X_REAL_IP'.
+RATE_LIMIT_IP_META = 'REMOTE_ADDR'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -149,8 +324,32 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Cache
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Версии лент, уведомления, подписки и лимиты должны быть общими для
+# всех воркеров, поэтому в бою нужен memcached: адреса через запятую в
+# YATUBE_MEMCACHED. Без него кэш у каждого процесса свой, и сбросы
+# версий видит только процесс, выполнивший запись.
+MEMCACHED_LOCATION = os.environ.get("YATUBE_MEMCACHED")
+CACHE_SHARED = bool(MEMCACHED_LOCATION)
+if CACHE_SHARED:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Фрагменты лент сбрасываются счётчиками версий (posts.feed_cache),
+# поэтому с общим кэшем время жизни может быть большим. С кэшем в
+# процессе сроки короткие: чужой процесс отдаёт устаревшее не дольше них.
+FEED_CACHE_TIMEOUT = 60 * 60 * 6 if CACHE_SHARED else 30
+# Срок жизни самих счётчиков версий (posts.feed_cache, posts.live):
+# без общего кэша они истекают и начинаются заново с текущего времени.
+CACHE_VERSION_TIMEOUT = None if CACHE_SHARED else FEED_CACHE_TIMEOUT
+# Множество авторов из подписок пользователя (posts.followed).
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24 if CACHE_SHARED else 30
@@ -3,6 +3,7 @@ from django.urls import include, path
 
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
+    path("api/", include("posts.api_urls", namespace="api")),
     path("admin/", admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),